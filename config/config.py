@@ -1,6 +1,8 @@
+import asyncio
 import json
 import os
 import logging
+from types import MappingProxyType
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +20,10 @@ _CONFIG_KEYS = [
     "geetest_new_member_prompt", "geetest_wrong_code_prompt",
     "level_no_info_message", "level_too_low_message", "level_pass_message",
     "timeout_reminder_geetest", "timeout_reminder_math",
+    "db_write_behind", "db_flush_interval_ms", "join_concurrency",
+    "outbound_rate_per_minute", "outbound_burst", "outbound_queue_size",
+    "level_cache_ttl", "level_prefetch",
+    "verified_retention_hours", "bypassed_retention_hours", "state_sweep_interval_minutes",
 ]
 
 _PROMPT_CONFIG_KEYS = [
@@ -30,6 +36,9 @@ _PROMPT_CONFIG_KEYS = [
     "timeout_reminder_geetest", "timeout_reminder_math",
 ]
 
+# 会影响正在进行的验证的群配置项，变化时同步到待验证状态和计时
+_PENDING_CONFIG_KEYS = ("enabled", "verification_timeout", "max_wrong_answers")
+
 
 class ConfigMixin:
     """配置管理相关方法"""
@@ -59,6 +68,17 @@ class ConfigMixin:
         self.verify_delay = self.config.get("verify_delay", schema_defaults.get("verify_delay", 0))
         self.recall_unverified_messages = self.config.get("recall_unverified_messages", schema_defaults.get("recall_unverified_messages", False))
         self.prompt_unverified_user = self.config.get("prompt_unverified_user", schema_defaults.get("prompt_unverified_user", True))
+        self.db_write_behind = self.config.get("db_write_behind", schema_defaults.get("db_write_behind", False))
+        self.db_flush_interval_ms = self.config.get("db_flush_interval_ms", schema_defaults.get("db_flush_interval_ms", 1000))
+        self.join_concurrency = self.config.get("join_concurrency", schema_defaults.get("join_concurrency", 8))
+        self.outbound_rate_per_minute = self.config.get("outbound_rate_per_minute", schema_defaults.get("outbound_rate_per_minute", 20))
+        self.outbound_burst = self.config.get("outbound_burst", schema_defaults.get("outbound_burst", 5))
+        self.outbound_queue_size = self.config.get("outbound_queue_size", schema_defaults.get("outbound_queue_size", 100))
+        self.level_cache_ttl = self.config.get("level_cache_ttl", schema_defaults.get("level_cache_ttl", 3600))
+        self.level_prefetch = self.config.get("level_prefetch", schema_defaults.get("level_prefetch", True))
+        self.verified_retention_hours = self.config.get("verified_retention_hours", schema_defaults.get("verified_retention_hours", 24))
+        self.bypassed_retention_hours = self.config.get("bypassed_retention_hours", schema_defaults.get("bypassed_retention_hours", 24))
+        self.state_sweep_interval_minutes = self.config.get("state_sweep_interval_minutes", schema_defaults.get("state_sweep_interval_minutes", 60))
 
         # 字符串类型
         self.api_base_url = self.config.get("api_base_url", schema_defaults.get("api_base_url", ""))
@@ -101,6 +121,18 @@ class ConfigMixin:
 
         # 群级别配置列表
         self.group_configs = self.config.get("group_configs", [])
+        self._compile_group_configs()
+
+        # 重新加载配置时同步更新出站队列限速参数和等级缓存有效期
+        outbound = getattr(self, "_outbound", None)
+        if outbound is not None:
+            outbound.configure(self.outbound_rate_per_minute, self.outbound_burst, self.outbound_queue_size)
+        level_cache = getattr(self, "_level_cache", None)
+        if level_cache is not None:
+            level_cache.ttl = self.level_cache_ttl
+        db = getattr(self, "db", None)
+        if db is not None:
+            db.configure_retention(self._build_state_retention(), self.state_sweep_interval_minutes * 60)
 
     def _save_config(self):
         """保存配置到磁盘"""
@@ -135,21 +167,48 @@ class ConfigMixin:
             self.config["level_pass_message"] = self.level_pass_message
             self.config["timeout_reminder_geetest"] = self.timeout_reminder_geetest
             self.config["timeout_reminder_math"] = self.timeout_reminder_math
+            self.config["db_write_behind"] = self.db_write_behind
+            self.config["db_flush_interval_ms"] = self.db_flush_interval_ms
+            self.config["join_concurrency"] = self.join_concurrency
+            self.config["outbound_rate_per_minute"] = self.outbound_rate_per_minute
+            self.config["outbound_burst"] = self.outbound_burst
+            self.config["outbound_queue_size"] = self.outbound_queue_size
+            self.config["level_cache_ttl"] = self.level_cache_ttl
+            self.config["level_prefetch"] = self.level_prefetch
+            self.config["verified_retention_hours"] = self.verified_retention_hours
+            self.config["bypassed_retention_hours"] = self.bypassed_retention_hours
+            self.config["state_sweep_interval_minutes"] = self.state_sweep_interval_minutes
             self.config["group_configs"] = self.group_configs
             # 保存到磁盘
-            self.config.save_config()
-            logger.info("[Geetest Verify] 配置已保存到文件")
+            # 写入合并后在线程中原子完成，不阻塞事件循环
+            persistence = getattr(self, "_persistence", None)
+            if persistence is not None:
+                persistence.save_config(self.config)
+            else:
+                self.config.save_config()
+            # 使设置页面已缓存的数据失效
+            web = getattr(self, "web", None)
+            if web is not None:
+                web.service.bump_revision()
+            logger.info("[Geetest Verify] 配置已提交保存")
         except Exception as e:
             logger.error(f"[Geetest Verify] 更新配置失败: {e}")
 
+    def _build_state_retention(self) -> dict:
+        """各状态的保留时长（秒），0 表示永久保留"""
+        return {
+            "verified": max(0, self.verified_retention_hours) * 3600,
+            "bypassed": max(0, self.bypassed_retention_hours) * 3600,
+        }
+
     def _update_group_config(self, gid: int, **kwargs):
-        """更新群级别配置"""
+        """更新群级别配置
+
+        返回把变化同步到本群待验证用户的后台任务（没有需要同步的待验证用户时为 None），
+        任务结果为各群取消的待验证人数。
+        """
         # 查找群级别配置
-        group_config = None
-        for config in self.group_configs:
-            if str(config.get("group_id")) == str(gid):
-                group_config = config
-                break
+        group_config = self._group_config_raw.get(int(gid))
 
         # 如果没有找到群级别配置，创建新的
         if not group_config:
@@ -209,29 +268,23 @@ class ConfigMixin:
                 elif field in _PROMPT_CONFIG_KEYS:
                     group_config[field] = getattr(self, field, "")
 
+        propagation = self._compile_group_configs()
+
         # 保存配置
         self._save_config()
+        return propagation
 
-    def _get_group_config(self, gid: int) -> dict:
-        """获取特定群的配置，如果没有群级别配置则返回默认配置"""
-        for group_config in self.group_configs:
-            if str(group_config.get("group_id")) == str(gid):
-                return {
-                    "enabled": group_config.get("enabled", False),
-                    "verification_timeout": group_config.get("verification_timeout", self.verification_timeout),
-                    "kick_delay": group_config.get("kick_delay", self.kick_delay),
-                    "max_wrong_answers": group_config.get("max_wrong_answers", self.max_wrong_answers),
-                    "enable_geetest_verify": group_config.get("enable_geetest_verify", self.enable_geetest_verify),
-                    "enable_level_verify": group_config.get("enable_level_verify", self.enable_level_verify),
-                    "min_qq_level": group_config.get("min_qq_level", self.min_qq_level),
-                    "verify_delay": group_config.get("verify_delay", self.verify_delay),
-                    "error_verification": group_config.get("error_verification") or self.error_verification,
-                    "recall_unverified_messages": group_config.get("recall_unverified_messages", self.recall_unverified_messages),
-                    "prompt_unverified_user": group_config.get("prompt_unverified_user", self.prompt_unverified_user),
-                    "welcome_image": group_config.get("welcome_image", self.welcome_image),
-                } | {key: group_config.get(key) or getattr(self, key) for key in _PROMPT_CONFIG_KEYS}
+    def _compile_group_configs(self):
+        """预编译群配置视图
 
-        return {
+        按整数群号建立只读的合并配置索引，_get_group_config 直接查表返回，
+        不再线性扫描和逐次构造字典。配置加载、命令修改或 WebUI 保存后重建，
+        并把有待验证用户的群的配置变化同步到这些用户，返回同步用的后台任务（无需同步时为 None）。
+        """
+        old_default = getattr(self, "_default_group_config", None)
+        old_index = getattr(self, "_group_config_index", None)
+
+        default_view = {
             "enabled": False,
             "verification_timeout": self.verification_timeout,
             "kick_delay": self.kick_delay,
@@ -246,21 +299,116 @@ class ConfigMixin:
             "welcome_image": self.welcome_image,
         } | {key: getattr(self, key) for key in _PROMPT_CONFIG_KEYS}
 
-    async def _sync_config_to_db(self):
-        """同步配置到数据库中待验证的记录"""
-        updated = 0
-        for key in self.db.all_keys():
-            state = self.db.get_cached(key)
-            if not state or state.get("status") != "pending":
+        raw_index = {}
+        view_index = {}
+        for group_config in self.group_configs:
+            try:
+                gid = int(group_config.get("group_id"))
+            except (ValueError, TypeError):
+                continue
+            # 与原先线性查找一致：同一群号以第一条配置为准
+            if gid in raw_index:
+                continue
+            raw_index[gid] = group_config
+            view_index[gid] = MappingProxyType(self._merge_group_config(group_config))
+
+        self._default_group_config = MappingProxyType(default_view)
+        self._group_config_raw = raw_index
+        self._group_config_index = view_index
+
+        if old_default is not None:
+            return self._schedule_config_propagation(old_default, old_index)
+        return None
+
+    def _merge_group_config(self, group_config: dict) -> dict:
+        """将群级别配置与全局配置合并"""
+        return {
+            "enabled": group_config.get("enabled", False),
+            "verification_timeout": group_config.get("verification_timeout", self.verification_timeout),
+            "kick_delay": group_config.get("kick_delay", self.kick_delay),
+            "max_wrong_answers": group_config.get("max_wrong_answers", self.max_wrong_answers),
+            "enable_geetest_verify": group_config.get("enable_geetest_verify", self.enable_geetest_verify),
+            "enable_level_verify": group_config.get("enable_level_verify", self.enable_level_verify),
+            "min_qq_level": group_config.get("min_qq_level", self.min_qq_level),
+            "verify_delay": group_config.get("verify_delay", self.verify_delay),
+            "error_verification": group_config.get("error_verification") or self.error_verification,
+            "recall_unverified_messages": group_config.get("recall_unverified_messages", self.recall_unverified_messages),
+            "prompt_unverified_user": group_config.get("prompt_unverified_user", self.prompt_unverified_user),
+            "welcome_image": group_config.get("welcome_image", self.welcome_image),
+        } | {key: group_config.get(key) or getattr(self, key) for key in _PROMPT_CONFIG_KEYS}
+
+    def _apply_group_config_patch(self, group_id, keys):
+        """WebUI 按字段修改单个群配置后调用，只更新该群编译视图中变化的键，不重新加载全部配置"""
+        try:
+            gid = int(group_id)
+        except (ValueError, TypeError):
+            return
+        raw = self._group_config_raw.get(gid)
+        if raw is None:
+            self._compile_group_configs()
+            return
+        merged = self._merge_group_config(raw)
+        view = self._group_config_index.get(gid)
+        if view is None:
+            updated = merged
+        else:
+            updated = dict(view)
+            for key in keys:
+                if key in merged:
+                    updated[key] = merged[key]
+        self._group_config_index[gid] = MappingProxyType(updated)
+        self._schedule_config_propagation(self._default_group_config, {gid: self._default_group_config if view is None else view}, [gid])
+
+    def _schedule_config_propagation(self, old_default, old_index: dict, gids=None):
+        """比较有待验证用户的群的新旧配置，有变化时在后台同步到这些群的待验证状态
+
+        只遍历有待验证用户的群（或 gids 指定的群），与群配置总数无关。
+        返回同步用的后台任务，没有需要同步的群时返回 None。
+        """
+        db = getattr(self, "db", None)
+        if db is None:
+            return None
+        changes = []
+        for gid in db.pending_groups() if gids is None else gids:
+            if not db.count_group_pending(gid):
                 continue
-            parts = key.split(":")
-            if len(parts) == 2:
-                try:
-                    gid = int(parts[0])
-                except (ValueError, TypeError):
-                    continue
-                group_config = self._get_group_config(gid)
-                await self.db.update_field(key, "max_wrong_answers", group_config["max_wrong_answers"])
-                updated += 1
-        if updated > 0:
-            logger.info(f"[Geetest Verify] 已同步配置到 {updated} 条待验证记录")
+            old = old_index.get(gid, old_default)
+            new = self._get_group_config(gid)
+            if any(old[key] != new[key] for key in _PENDING_CONFIG_KEYS):
+                changes.append((gid, old, new))
+        if not changes:
+            return None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        task = asyncio.create_task(self._propagate_group_config_changes(changes))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def _get_group_config(self, gid: int):
+        """获取特定群的配置（只读视图），如果没有群级别配置则返回默认配置"""
+        view = self._group_config_index.get(gid)
+        if view is None and not isinstance(gid, int):
+            try:
+                view = self._group_config_index.get(int(gid))
+            except (ValueError, TypeError):
+                view = None
+        return self._default_group_config if view is None else view
+
+    def _has_group_config(self, gid: int) -> bool:
+        """是否存在群级别配置"""
+        return gid in self._group_config_index
+
+    async def _sync_config_to_db(self):
+        """启动时把当前配置的最大错误次数同步到待验证记录，只写入有变化的记录，一个事务提交"""
+        records = {}
+        for key, gid, _, state in self.db.pending_items():
+            max_wrong_answers = self._get_group_config(gid)["max_wrong_answers"]
+            if state.get("status") == "pending" and state.get("max_wrong_answers") != max_wrong_answers:
+                state["max_wrong_answers"] = max_wrong_answers
+                records[key] = state
+        await self.db.set_many(records)
+        if records:
+            logger.info(f"[Geetest Verify] 已同步配置到 {len(records)} 条待验证记录")
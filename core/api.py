@@ -1,53 +1,194 @@
+import asyncio
 import logging
+import random
+import time
 from urllib.parse import urlparse
 import aiohttp
 
 from astrbot.core.config.default import VERSION
 
+from .breaker import CircuitBreaker
+
 logger = logging.getLogger(__name__)
 
 PLUGIN_VERSION = "1.3.0"
 
+# 单次请求的超时（秒）：连接、读取与总时长
+_CONNECT_TIMEOUT = 3
+_READ_TIMEOUT = 5
+_TOTAL_TIMEOUT = 8
+# 重试次数与退避基数（秒），退避带随机抖动
+_MAX_RETRIES = 2
+_RETRY_BACKOFF = 0.3
+# 对这些状态码视为服务端暂时不可用，可以重试
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class _RetryableError(Exception):
+    pass
+
 
 class GeetestAPIMixin:
     """极验验证 API 调用相关方法"""
 
+    def _init_geetest_client(self):
+        """初始化熔断器和请求统计（会话需在事件循环中通过 _create_geetest_session 创建）"""
+        self.session = None
+        self._geetest_breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+        self._geetest_headers_cache = (None, None)
+        self._geetest_stats = {
+            "requests": 0,
+            "attempts": 0,
+            "retries": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "breaker_rejected": 0,
+            "total_latency_ms": 0.0,
+            "max_latency_ms": 0.0,
+        }
+
+    def _create_geetest_session(self) -> aiohttp.ClientSession:
+        """创建带长连接池、DNS 缓存和默认超时的专用会话"""
+        connector = aiohttp.TCPConnector(
+            limit=64,
+            limit_per_host=32,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        timeout = aiohttp.ClientTimeout(total=_TOTAL_TIMEOUT, connect=_CONNECT_TIMEOUT, sock_read=_READ_TIMEOUT)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def _warmup_geetest_session(self):
+        """预热连接池：提前完成 DNS 解析和 TLS 握手，首个入群用户无需等待建连"""
+        if not self.api_base_url or not self.session:
+            return
+        try:
+            async with self.session.head(self.api_base_url, timeout=aiohttp.ClientTimeout(total=_CONNECT_TIMEOUT)) as response:
+                logger.debug(f"[Geetest Verify] 验证服务器连接预热完成，状态码: {response.status}")
+        except Exception as e:
+            logger.debug(f"[Geetest Verify] 验证服务器连接预热失败: {e}")
+
+    def _geetest_available(self) -> bool:
+        """极验服务是否可用（已配置且熔断器未打开），熔断期间直接回退到数学题验证"""
+        return bool(self.api_key) and not self._geetest_breaker.is_open
+
+    def _get_geetest_headers(self) -> dict:
+        api_key, headers = self._geetest_headers_cache
+        if api_key != self.api_key or headers is None:
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "User-Agent": f"AstrBot/v{VERSION} group_geetest_verify/v{PLUGIN_VERSION}"
+            }
+            self._geetest_headers_cache = (self.api_key, headers)
+        return headers
+
+    def get_geetest_stats(self) -> dict:
+        """返回请求延迟、错误计数和熔断器状态"""
+        stats = dict(self._geetest_stats)
+        requests = stats["requests"]
+        stats["avg_latency_ms"] = stats["total_latency_ms"] / requests if requests else 0.0
+        stats["breaker"] = self._geetest_breaker.get_stats()
+        return stats
+
+    async def _post_geetest(self, path: str, data: dict, retry_on_timeout: bool):
+        """向验证服务器发送请求，返回 JSON 结果；失败返回 None
+
+        连接失败总是可以重试；超时和 5xx 只有在请求幂等时（retry_on_timeout）才重试。
+        """
+        stats = self._geetest_stats
+        breaker = self._geetest_breaker
+        is_probe = breaker.state == breaker.HALF_OPEN
+        if not breaker.allow():
+            stats["breaker_rejected"] += 1
+            logger.warning("[Geetest Verify] 验证服务器熔断中，跳过请求")
+            return None
+
+        stats["requests"] += 1
+        start = time.perf_counter()
+
+        try:
+            if self.session is None or self.session.closed:
+                self.session = self._create_geetest_session()
+            url = f"{self.api_base_url}{path}"
+            headers = self._get_geetest_headers()
+
+            for attempt in range(_MAX_RETRIES + 1):
+                if attempt:
+                    stats["retries"] += 1
+                    await asyncio.sleep(_RETRY_BACKOFF * (2 ** (attempt - 1)) * (0.5 + random.random()))
+                stats["attempts"] += 1
+                try:
+                    async with self.session.post(url, json=data, headers=headers) as response:
+                        if response.status in _RETRYABLE_STATUS and retry_on_timeout:
+                            raise _RetryableError(f"状态码 {response.status}")
+                        if response.status != 200:
+                            logger.error(f"[Geetest Verify] API 请求失败，状态码: {response.status}")
+                            # 5xx 和 429 说明服务端异常或过载，即使不重试也计入熔断；其他状态码说明服务端可达
+                            if response.status == 429 or response.status >= 500:
+                                stats["errors"] += 1
+                                self._geetest_breaker.record_failure()
+                            else:
+                                self._geetest_breaker.record_success()
+                            return None
+                        result = await response.json()
+                        self._geetest_breaker.record_success()
+                        return result
+                except aiohttp.ClientConnectorError as e:
+                    last_error = e
+                except (asyncio.TimeoutError, _RetryableError) as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        stats["timeouts"] += 1
+                    last_error = e
+                    if not retry_on_timeout:
+                        break
+                except aiohttp.ClientError as e:
+                    last_error = e
+                    if not retry_on_timeout:
+                        break
+
+            stats["errors"] += 1
+            self._geetest_breaker.record_failure()
+            logger.error(f"[Geetest Verify] API 请求异常: {last_error!r}")
+            return None
+        except Exception as e:
+            stats["errors"] += 1
+            self._geetest_breaker.record_failure()
+            logger.error(f"[Geetest Verify] API 请求异常: {e}")
+            return None
+        finally:
+            # 被取消等没有记录结果的探测请求必须释放名额，否则熔断器会一直拒绝
+            if is_probe and breaker.state == breaker.HALF_OPEN:
+                breaker.release_probe()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stats["total_latency_ms"] += elapsed_ms
+            stats["max_latency_ms"] = max(stats["max_latency_ms"], elapsed_ms)
+
     async def _create_geetest_verify(self, gid: int, uid: str) -> str:
         """调用极验 API 生成验证链接，返回路径部分"""
         if not self.api_key:
             logger.error("[Geetest Verify] API 密钥未配置")
             return None
 
-        url = f"{self.api_base_url}/verify/create"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "User-Agent": f"AstrBot/v{VERSION} group_geetest_verify/v{PLUGIN_VERSION}"
-        }
         data = {
             "group_id": str(gid),
             "user_id": uid
         }
 
-        try:
-            async with self.session.post(url, json=data, headers=headers) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    if result.get("code") == 0:
-                        full_url = result.get("data", {}).get("url")
-                        parsed = urlparse(full_url)
-                        verify_url_path = parsed.path
-                        logger.info(f"[Geetest Verify] 成功生成验证链接路径: {verify_url_path}")
-                        return verify_url_path
-                    else:
-                        logger.error(f"[Geetest Verify] API 返回错误: {result.get('msg')}")
-                        return None
-                else:
-                    logger.error(f"[Geetest Verify] API 请求失败，状态码: {response.status}")
-                    return None
-        except aiohttp.ClientError as e:
-            logger.error(f"[Geetest Verify] API 请求异常: {e}")
+        result = await self._post_geetest("/verify/create", data, retry_on_timeout=True)
+        if result is None:
             return None
+
+        try:
+            if result.get("code") == 0:
+                full_url = result.get("data", {}).get("url")
+                parsed = urlparse(full_url)
+                verify_url_path = parsed.path
+                logger.info(f"[Geetest Verify] 成功生成验证链接路径: {verify_url_path}")
+                return verify_url_path
+            else:
+                logger.error(f"[Geetest Verify] API 返回错误: {result.get('msg')}")
+                return None
         except Exception as e:
             logger.error(f"[Geetest Verify] 生成验证链接异常: {e}")
             return None
@@ -58,34 +199,24 @@ class GeetestAPIMixin:
             logger.error("[Geetest Verify] API 密钥未配置")
             return False
 
-        url = f"{self.api_base_url}/verify/check"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "User-Agent": f"AstrBot/v{VERSION} group_geetest_verify/v{PLUGIN_VERSION}"
-        }
         data = {
             "group_id": str(gid),
             "user_id": uid,
             "code": code
         }
 
-        try:
-            async with self.session.post(url, json=data, headers=headers) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    if result.get("code") == 0 and result.get("passed"):
-                        logger.info("[Geetest Verify] 验证码验证成功")
-                        return True
-                    else:
-                        logger.info(f"[Geetest Verify] 验证码验证失败: {result.get('msg')}")
-                        return False
-                else:
-                    logger.error(f"[Geetest Verify] API 请求失败，状态码: {response.status}")
-                    return False
-        except aiohttp.ClientError as e:
-            logger.error(f"[Geetest Verify] API 请求异常: {e}")
+        # 校验验证码可能消耗验证码，只在请求未发出（连接失败）时重试
+        result = await self._post_geetest("/verify/check", data, retry_on_timeout=False)
+        if result is None:
             return False
+
+        try:
+            if result.get("code") == 0 and result.get("passed"):
+                logger.info("[Geetest Verify] 验证码验证成功")
+                return True
+            else:
+                logger.info(f"[Geetest Verify] 验证码验证失败: {result.get('msg')}")
+                return False
         except Exception as e:
             logger.error(f"[Geetest Verify] 验证验证码异常: {e}")
             return False
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 合并后单条消息的最大长度
+_MAX_MERGED_LENGTH = 3000
+# 发送失败后的重试次数与退避基数（秒）
+_MAX_RETRIES = 2
+_RETRY_BACKOFF = 1.0
+# 队列空闲多久后回收其发送协程（秒）
+_IDLE_TIMEOUT = 60.0
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，capacity 为突发上限"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def configure(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, float(capacity))
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class OutboundItem:
+    """队列中的一条待发送消息"""
+
+    __slots__ = ("text", "image", "coalesce", "future", "enqueued_at")
+
+    def __init__(self, text: str, image: Optional[str], coalesce: bool, future: asyncio.Future):
+        self.text = text
+        self.image = image
+        self.coalesce = coalesce
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class _GroupQueue:
+    __slots__ = ("items", "slots", "wakeup", "bucket", "worker")
+
+    def __init__(self, capacity: int, bucket: TokenBucket):
+        self.items: deque = deque()
+        self.slots = asyncio.Semaphore(capacity)
+        self.wakeup = asyncio.Event()
+        self.bucket = bucket
+        self.worker: Optional[asyncio.Task] = None
+
+
+class OutboundQueue:
+    """按 (平台, 群号) 划分的出站消息队列
+
+    每个群一个有界队列和一个令牌桶，由独立的发送协程按速率发送，
+    同一群内消息保持顺序。队列满时 send 会等待（背压），
+    发送协程因限速等待期间积压的连续短消息会合并为一条发送。
+    """
+
+    def __init__(self, deliver: Callable[[str, int, str, Optional[str]], Awaitable[None]],
+                 rate_per_minute: float = 20, burst: int = 5, capacity: int = 100):
+        self._deliver = deliver
+        self._rate = max(rate_per_minute, 1) / 60
+        self._burst = max(int(burst), 1)
+        self._capacity = max(int(capacity), 1)
+        self._queues: Dict[tuple, _GroupQueue] = {}
+        self._closed = False
+        self._stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "deliveries": 0,
+            "merged": 0,
+            "failed": 0,
+            "retries": 0,
+            "backpressure_waits": 0,
+            "max_depth": 0,
+            "total_latency_ms": 0.0,
+            "max_latency_ms": 0.0,
+        }
+
+    def configure(self, rate_per_minute: float, burst: int, capacity: int):
+        """更新限速参数；已存在的令牌桶立即生效，队列容量对新建的队列生效"""
+        self._rate = max(rate_per_minute, 1) / 60
+        self._burst = max(int(burst), 1)
+        self._capacity = max(int(capacity), 1)
+        for queue in self._queues.values():
+            queue.bucket.configure(self._rate, self._burst)
+
+    async def send(self, platform: str, gid: int, text: str, image: str = None, coalesce: bool = True) -> asyncio.Future:
+        """将消息放入队列，队列满时等待空位；返回发送结果的 Future（成功为 True）"""
+        future = asyncio.get_running_loop().create_future()
+        if self._closed:
+            future.set_result(False)
+            return future
+
+        key = (platform, gid)
+        while True:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = _GroupQueue(self._capacity, TokenBucket(self._rate, self._burst))
+                self._queues[key] = queue
+
+            if queue.slots.locked():
+                self._stats["backpressure_waits"] += 1
+            await queue.slots.acquire()
+            # 等待期间发送协程可能已因空闲回收该队列：仍在表中则直接使用，
+            # 已被新队列取代则改投新队列，保证每个群只有一个令牌桶和发送协程
+            current = self._queues.get(key)
+            if current is queue:
+                break
+            if current is None:
+                self._queues[key] = queue
+                break
+            queue.slots.release()
+
+        queue.items.append(OutboundItem(text, image, coalesce and not image, future))
+        queue.wakeup.set()
+        self._stats["enqueued"] += 1
+        self._stats["max_depth"] = max(self._stats["max_depth"], len(queue.items))
+
+        if queue.worker is None or queue.worker.done():
+            queue.worker = asyncio.create_task(self._run(key, queue))
+        return future
+
+    async def close(self, drain_timeout: float = 5.0):
+        """停止接收新消息，在 drain_timeout 内尽量发完已排队的消息，其余丢弃"""
+        self._closed = True
+        workers = [queue.worker for queue in self._queues.values() if queue.worker and not queue.worker.done()]
+        if workers:
+            _, still_running = await asyncio.wait(workers, timeout=drain_timeout)
+            for task in still_running:
+                task.cancel()
+            if still_running:
+                await asyncio.gather(*still_running, return_exceptions=True)
+
+        dropped = 0
+        for queue in self._queues.values():
+            while queue.items:
+                item = queue.items.popleft()
+                if not item.future.done():
+                    item.future.set_result(False)
+                dropped += 1
+        self._queues.clear()
+        if dropped:
+            logger.warning(f"[Geetest Verify] 出站队列关闭，丢弃 {dropped} 条未发送消息")
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        # 排队耗时按每条消息累计，合并发送的消息各算一条
+        delivered_items = stats["sent"] + stats["failed"]
+        stats["avg_latency_ms"] = stats["total_latency_ms"] / delivered_items if delivered_items else 0.0
+        stats["queues"] = len(self._queues)
+        stats["depth"] = sum(len(queue.items) for queue in self._queues.values())
+        stats["depth_by_group"] = {f"{platform}:{gid}": len(queue.items)
+                                   for (platform, gid), queue in self._queues.items() if queue.items}
+        return stats
+
+    def _take_batch(self, queue: _GroupQueue) -> list:
+        """取出队首消息，并合并其后连续的可合并消息"""
+        first = queue.items.popleft()
+        batch = [first]
+        if not first.coalesce:
+            return batch
+        length = len(first.text)
+        while queue.items:
+            item = queue.items[0]
+            if not item.coalesce or length + len(item.text) + 2 > _MAX_MERGED_LENGTH:
+                break
+            batch.append(queue.items.popleft())
+            length += len(item.text) + 2
+        return batch
+
+    async def _run(self, key: tuple, queue: _GroupQueue):
+        platform, gid = key
+        try:
+            while True:
+                if not queue.items:
+                    if self._closed:
+                        return
+                    queue.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(queue.wakeup.wait(), _IDLE_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        if not queue.items:
+                            return
+                    continue
+
+                # 等待令牌期间到达的消息会在下面一并合并
+                await queue.bucket.acquire()
+                batch = self._take_batch(queue)
+                for _ in batch:
+                    queue.slots.release()
+
+                if len(batch) > 1:
+                    text = "\n\n".join(item.text for item in batch)
+                    self._stats["merged"] += len(batch) - 1
+                else:
+                    text = batch[0].text
+                ok = await self._deliver_with_retry(platform, gid, text, batch[0].image)
+
+                now = time.monotonic()
+                stats = self._stats
+                stats["deliveries"] += 1
+                stats["sent" if ok else "failed"] += len(batch)
+                for item in batch:
+                    latency_ms = (now - item.enqueued_at) * 1000
+                    stats["total_latency_ms"] += latency_ms
+                    stats["max_latency_ms"] = max(stats["max_latency_ms"], latency_ms)
+                    if not item.future.done():
+                        item.future.set_result(ok)
+        finally:
+            if self._queues.get(key) is queue and not queue.items:
+                del self._queues[key]
+
+    async def _deliver_with_retry(self, platform: str, gid: int, text: str, image: Optional[str]) -> bool:
+        for attempt in range(_MAX_RETRIES + 1):
+            if attempt:
+                self._stats["retries"] += 1
+                await asyncio.sleep(_RETRY_BACKOFF * (2 ** (attempt - 1)))
+            try:
+                await self._deliver(platform, gid, text, image)
+                return True
+            except Exception as e:
+                logger.warning(f"[Geetest Verify] 向群 {gid} 发送消息失败（第 {attempt + 1} 次）: {e}")
+        logger.error(f"[Geetest Verify] 向群 {gid} 发送消息失败，已放弃: {text[:50]}")
+        return False
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from .breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# 每批最多处理的动作数、最大尝试次数与重试退避上限（秒）
+_BATCH_SIZE = 50
+_MAX_ATTEMPTS = 6
+_MAX_BACKOFF = 300.0
+# 没有到期动作时的最长等待时间（秒）
+_IDLE_WAIT = 30.0
+
+
+class ActionOutbox:
+    """持久化的动作发件箱（踢人、撤回、通知）
+
+    事件处理只负责把动作写入数据库的 action_outbox 表并立即返回，
+    由后台协程按批取出到期的动作执行，失败按指数退避重试。
+    每个平台一个熔断器，平台接口持续失败时暂停该平台的动作，不消耗重试次数。
+    进程重启后未完成的动作会继续执行。
+    """
+
+    def __init__(self, db, executor: Callable[[str, int, str, str, dict], Awaitable[None]]):
+        self._db = db
+        self._executor = executor
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._stats = {
+            "enqueued": 0,
+            "duplicates": 0,
+            "executed": 0,
+            "failed": 0,
+            "retries": 0,
+            "dropped": 0,
+            "breaker_skipped": 0,
+            "batches": 0,
+        }
+
+    def start(self):
+        if self._worker and not self._worker.done():
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """停止后台协程；正在执行的批次最多等待 drain_timeout 秒，未完成的动作保留在数据库中"""
+        if not self._worker:
+            return
+        worker, self._worker = self._worker, None
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(worker, drain_timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            pass
+
+    async def enqueue(self, platform: str, gid: int, uid: str, action: str, payload: dict = None,
+                      delay: float = 0.0, idem_suffix: str = "") -> bool:
+        """写入一个动作，相同 gid:uid:action（及后缀）的动作未完成前不会重复写入"""
+        idem_key = f"{gid}:{uid}:{action}"
+        if idem_suffix:
+            idem_key = f"{idem_key}:{idem_suffix}"
+        row = (idem_key, platform, gid, str(uid), action, json.dumps(payload or {}, ensure_ascii=False), time.time() + delay)
+        added = await self._db.enqueue_actions([row])
+        if added:
+            self._stats["enqueued"] += 1
+            if self._wakeup is not None:
+                self._wakeup.set()
+        else:
+            self._stats["duplicates"] += 1
+        return bool(added)
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["breakers"] = {platform: breaker.get_stats() for platform, breaker in self._breakers.items()}
+        return stats
+
+    def _get_breaker(self, platform: str) -> CircuitBreaker:
+        breaker = self._breakers.get(platform)
+        if breaker is None:
+            breaker = self._breakers[platform] = CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+        return breaker
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                processed = await self._process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Geetest Verify] 处理动作发件箱失败: {e}")
+                processed = 0
+            if processed or self._stopping:
+                continue
+
+            self._wakeup.clear()
+            next_time = await self._db.next_action_time()
+            timeout = _IDLE_WAIT if next_time is None else min(_IDLE_WAIT, max(0.05, next_time - time.time()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _process_batch(self) -> int:
+        now = time.time()
+        rows = await self._db.fetch_due_actions(now, _BATCH_SIZE)
+        if not rows:
+            return 0
+
+        runnable = []
+        retry = []
+        for row in rows:
+            breaker = self._get_breaker(row[1])
+            if breaker.allow():
+                runnable.append(row)
+            else:
+                # 熔断期间推迟到探测时间之后，不计入尝试次数
+                self._stats["breaker_skipped"] += 1
+                retry.append((now + breaker.reset_timeout, row[6], "circuit open", row[0]))
+
+        results = await asyncio.gather(*(self._execute(row) for row in runnable), return_exceptions=True)
+
+        done = []
+        for row, result in zip(runnable, results):
+            idem_key, platform, gid, uid, action, _, attempts = row
+            breaker = self._get_breaker(platform)
+            if not isinstance(result, Exception):
+                breaker.record_success()
+                self._stats["executed"] += 1
+                done.append(idem_key)
+                continue
+
+            breaker.record_failure()
+            attempts += 1
+            if attempts >= _MAX_ATTEMPTS:
+                self._stats["dropped"] += 1
+                logger.error(f"[Geetest Verify] 动作 {idem_key} 连续失败 {attempts} 次，已放弃: {result}")
+                done.append(idem_key)
+            else:
+                self._stats["retries"] += 1
+                backoff = min(_MAX_BACKOFF, 2.0 ** attempts)
+                logger.warning(f"[Geetest Verify] 动作 {idem_key} 执行失败（第 {attempts} 次），{backoff:.0f} 秒后重试: {result}")
+                retry.append((now + backoff, attempts, str(result)[:200], idem_key))
+            self._stats["failed"] += 1
+
+        await self._db.settle_actions(done, retry)
+        self._stats["batches"] += 1
+        return len(runnable)
+
+    async def _execute(self, row):
+        _, platform, gid, uid, action, payload, _ = row
+        await self._executor(platform, gid, uid, action, json.loads(payload) if payload else {})
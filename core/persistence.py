@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认合并窗口（秒）：窗口内对同一文件的多次保存只写一次
+_DEBOUNCE = 0.5
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8"):
+    """写入同目录下的临时文件后重命名替换，崩溃时不会留下写了一半的文件"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class _PendingWrite:
+    __slots__ = ("serialize", "fallback", "encoding", "requested_at")
+
+    def __init__(self, serialize: Optional[Callable[[], str]], fallback: Optional[Callable[[], None]], encoding: str):
+        self.serialize = serialize
+        self.fallback = fallback
+        self.encoding = encoding
+        self.requested_at = time.monotonic()
+
+
+class DebouncedWriter:
+    """合并、异步、原子的 JSON 文件写入
+
+    save_json / save_config 只登记待写入的文件并立即返回；合并窗口结束后，
+    在事件循环中取当时的数据快照序列化，再放到线程中通过临时文件 + 重命名写入。
+    窗口内对同一文件的多次保存合并为一次写入。卸载插件时调用 close 写完剩余的文件。
+    """
+
+    def __init__(self, debounce: float = _DEBOUNCE):
+        self.debounce = debounce
+        self._pending: Dict[Path, _PendingWrite] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._stats = {
+            "requested": 0,
+            "coalesced": 0,
+            "writes": 0,
+            "failed": 0,
+            "total_write_ms": 0.0,
+            "max_write_ms": 0.0,
+            "max_delay_ms": 0.0,
+        }
+
+    def save_json(self, path: Path, data: Callable[[], Any], encoding: str = "utf-8"):
+        """登记一次 JSON 文件保存；data 在真正写入时才调用，取最新的数据"""
+        def serialize() -> str:
+            return json.dumps(data(), ensure_ascii=False, indent=2)
+
+        self._schedule(Path(path), _PendingWrite(serialize, None, encoding))
+
+    def save_config(self, config):
+        """登记一次 AstrBotConfig 保存，格式与 AstrBotConfig.save_config 一致
+
+        拿不到配置文件路径时，到期后退回到 config.save_config()。
+        """
+        config_path = getattr(config, "config_path", None)
+        if not config_path:
+            self._schedule(Path(f"<config:{id(config)}>"), _PendingWrite(None, config.save_config, "utf-8"))
+            return
+        self.save_json(Path(config_path), lambda: config, encoding="utf-8-sig")
+
+    async def flush(self):
+        """立即写入所有待保存的文件"""
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            for path, item in pending.items():
+                await self._write(path, item)
+
+    async def close(self):
+        task, self._flush_task = self._flush_task, None
+        # 先写完（会等待正在进行的写入），之后延迟任务只剩合并窗口的等待，可以直接取消
+        await self.flush()
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        writes = stats["writes"]
+        stats["avg_write_ms"] = stats["total_write_ms"] / writes if writes else 0.0
+        stats["pending"] = len(self._pending)
+        return stats
+
+    def _schedule(self, path: Path, item: _PendingWrite):
+        self._stats["requested"] += 1
+        previous = self._pending.get(path)
+        if previous is not None:
+            # 保留最早的登记时间，用于统计最长延迟
+            item.requested_at = previous.requested_at
+            self._stats["coalesced"] += 1
+        self._pending[path] = item
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # 不在事件循环中（如初始化阶段），直接同步写入
+            self._pending.pop(path, None)
+            self._write_sync(path, item)
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # 写入期间新登记的保存由下一轮处理
+        while self._pending:
+            await asyncio.sleep(self.debounce)
+            await self.flush()
+
+    async def _write(self, path: Path, item: _PendingWrite):
+        started = time.monotonic()
+        try:
+            if item.serialize is None:
+                item.fallback()
+            else:
+                # 在事件循环中序列化，保证拿到的是一致的数据快照
+                text = item.serialize()
+                await asyncio.to_thread(atomic_write_text, path, text, item.encoding)
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.error(f"[Geetest Verify] 保存文件 {path} 失败: {e}")
+            return
+        self._record(started, item)
+
+    def _write_sync(self, path: Path, item: _PendingWrite):
+        started = time.monotonic()
+        try:
+            if item.serialize is None:
+                item.fallback()
+            else:
+                atomic_write_text(path, item.serialize(), item.encoding)
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.error(f"[Geetest Verify] 保存文件 {path} 失败: {e}")
+            return
+        self._record(started, item)
+
+    def _record(self, started: float, item: _PendingWrite):
+        now = time.monotonic()
+        write_ms = (now - started) * 1000
+        stats = self._stats
+        stats["writes"] += 1
+        stats["total_write_ms"] += write_ms
+        stats["max_write_ms"] = max(stats["max_write_ms"], write_ms)
+        stats["max_delay_ms"] = max(stats["max_delay_ms"], (now - item.requested_at) * 1000)
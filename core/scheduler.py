@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TimerEntry:
+    """调度器中的一个截止时间条目"""
+
+    __slots__ = ("key", "deadline", "stage", "payload", "cancelled")
+
+    def __init__(self, key: str, deadline: float, stage: str, payload: dict):
+        self.key = key
+        self.deadline = deadline
+        self.stage = stage
+        self.payload = payload
+        self.cancelled = False
+
+
+class DeadlineScheduler:
+    """单协程驱动的截止时间调度器
+
+    所有待验证用户的提醒、超时通知和踢出截止时间都放在同一个最小堆中，
+    由一个驱动协程按批触发，取代每个用户一个 asyncio.Task 的做法。
+    调度为 O(log n)，取消为 O(1)（惰性删除，堆中失效条目过多时整体压缩）。
+    截止时间使用 time.time() 墙上时钟，便于持久化。
+    """
+
+    def __init__(self, handler: Callable[[TimerEntry], Awaitable[None]], batch_size: int = 200, max_inflight_batches: int = 4):
+        self._handler = handler
+        self._batch_size = batch_size
+        self._max_inflight_batches = max_inflight_batches
+        self._heap: list = []
+        self._entries: Dict[str, TimerEntry] = {}
+        self._seq = itertools.count()
+        self._stale = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._driver: Optional[asyncio.Task] = None
+        self._running: set = set()
+        self._stats = {
+            "scheduled": 0,
+            "cancelled": 0,
+            "fired": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+            "max_lag_ms": 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def start(self):
+        if self._driver and not self._driver.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._driver = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 5.0) -> int:
+        """停止驱动协程，在 drain_timeout 内等待正在执行的批次结束，超时则取消。
+
+        返回尚未触发的条目数，条目本身保留，调用方可据此保存检查点。
+        """
+        if self._driver and not self._driver.done():
+            self._driver.cancel()
+            try:
+                await self._driver
+            except asyncio.CancelledError:
+                pass
+        self._driver = None
+
+        if self._running:
+            _, still_running = await asyncio.wait(set(self._running), timeout=drain_timeout)
+            for task in still_running:
+                task.cancel()
+            if still_running:
+                await asyncio.gather(*still_running, return_exceptions=True)
+        self._running.clear()
+
+        return len(self._entries)
+
+    def schedule(self, key: str, deadline: float, stage: str, payload: dict = None) -> TimerEntry:
+        """为 key 设置（或替换）截止时间"""
+        old = self._entries.get(key)
+        if old is not None:
+            old.cancelled = True
+            self._stale += 1
+
+        entry = TimerEntry(key, deadline, stage, payload or {})
+        self._entries[key] = entry
+        heapq.heappush(self._heap, (deadline, next(self._seq), entry))
+        self._stats["scheduled"] += 1
+
+        if old is not None:
+            self._maybe_compact()
+        if self._heap[0][2] is entry and self._wakeup is not None:
+            self._wakeup.set()
+        return entry
+
+    def cancel(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry.cancelled = True
+        self._stale += 1
+        self._stats["cancelled"] += 1
+        self._maybe_compact()
+        return True
+
+    def cancel_many(self, keys) -> int:
+        """批量取消，返回实际取消的条目数；只在最后检查一次是否需要压缩堆"""
+        cancelled = 0
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                continue
+            entry.cancelled = True
+            cancelled += 1
+        self._stale += cancelled
+        self._stats["cancelled"] += cancelled
+        self._maybe_compact()
+        return cancelled
+
+    def get(self, key: str) -> Optional[TimerEntry]:
+        return self._entries.get(key)
+
+    def entries(self) -> List[TimerEntry]:
+        return list(self._entries.values())
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["pending"] = len(self._entries)
+        stats["heap_size"] = len(self._heap)
+        stats["running_batches"] = len(self._running)
+        return stats
+
+    def _maybe_compact(self):
+        """失效条目超过一定数量且占堆一半以上时压缩"""
+        if self._stale > 1024 and self._stale > len(self._heap) // 2:
+            self._compact()
+
+    def _compact(self):
+        self._heap = [item for item in self._heap if not item[2].cancelled]
+        heapq.heapify(self._heap)
+        self._stale = 0
+
+    def _pop_due(self, now: float) -> List[TimerEntry]:
+        due = []
+        heap = self._heap
+        while heap and len(due) < self._batch_size:
+            deadline, _, entry = heap[0]
+            if entry.cancelled:
+                heapq.heappop(heap)
+                self._stale -= 1
+                continue
+            if deadline > now:
+                break
+            heapq.heappop(heap)
+            self._entries.pop(entry.key, None)
+            due.append(entry)
+        return due
+
+    async def _run(self):
+        while True:
+            # 限制同时执行的批次数，大量过期条目（如重启后恢复）按批有序处理
+            while len(self._running) >= self._max_inflight_batches:
+                await asyncio.wait(set(self._running), return_when=asyncio.FIRST_COMPLETED)
+
+            now = time.time()
+            due = self._pop_due(now)
+            if due:
+                stats = self._stats
+                stats["fired"] += len(due)
+                stats["batches"] += 1
+                stats["max_batch_size"] = max(stats["max_batch_size"], len(due))
+                stats["max_lag_ms"] = max(stats["max_lag_ms"], (now - due[0].deadline) * 1000)
+
+                task = asyncio.create_task(self._fire(due))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+                # 让出事件循环，避免大量过期条目时长时间占用
+                await asyncio.sleep(0)
+                continue
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, batch: List[TimerEntry]):
+        results = await asyncio.gather(*(self._handler(entry) for entry in batch), return_exceptions=True)
+        for entry, result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error(f"[Geetest Verify] 处理定时任务失败 ({entry.key}, {entry.stage}): {result}")
@@ -1,10 +1,23 @@
-import asyncio
 import random
+import asyncio
 import logging
+import time
 from typing import Tuple
 
+from .cache import SingleFlight, TTLCache
+from .scheduler import TimerEntry
+
 logger = logging.getLogger(__name__)
 
+# QQ 等级缓存的最大条目数与同时进行的等级查询数
+_LEVEL_CACHE_SIZE = 10000
+_LEVEL_LOOKUP_CONCURRENCY = 4
+# 群管理员名单缓存有效期（秒）与最大群数
+_ADMIN_ROSTER_TTL = 600
+_ADMIN_ROSTER_SIZE = 4096
+# 群内待验证用户的批量操作：取消验证、直接通过、重新出题
+_PENDING_ACTION_NAMES = {"cancel": "取消验证", "approve": "通过验证", "reissue": "重新发送验证"}
+
 
 class VerifyMixin:
     """验证流程相关方法：数学题生成、验证流程启动、超时踢出、等级查询、权限检查"""
@@ -26,239 +39,481 @@ class VerifyMixin:
             return question, answer
 
     async def _start_verification_process(self, event, uid: str, gid: int, question: str, answer: int, is_new_member: bool, group_config: dict = None):
-        """为用户启动或重启验证流程"""
+        """为用户启动或重启验证流程
+
+        先确定验证方式和第一个计时阶段，再把状态连同截止时间一次写入数据库。
+        """
         state_key = f"{gid}:{uid}"
 
         if group_config is None:
             group_config = self._get_group_config(gid)
 
-        old_task = self._tasks.get(state_key)
-        if old_task and not old_task.done():
-            old_task.cancel()
+        platform = self._get_platform(event)
 
-        task = asyncio.create_task(self._timeout_kick(uid, gid, group_config["verification_timeout"], event))
-        self._tasks[state_key] = task
+        verify_url_path = None
+        if group_config["enable_geetest_verify"] and self._geetest_available():
+            try:
+                verify_url_path = await self._create_geetest_verify(gid, uid)
+            except Exception as e:
+                logger.warning(f"[Geetest Verify] 调用极验 API 失败: {e}，回退到算术验证")
 
-        if is_new_member:
-            await self.db.set(state_key, {
-                "status": "pending",
-                "question": question,
-                "answer": answer,
-                "wrong_count": 0,
-                "verify_method": "geetest",
-                "max_wrong_answers": group_config["max_wrong_answers"]
-            })
-        else:
+        wrong_count = 0
+        if not is_new_member:
             existing = self.db.get_cached(state_key) or {}
             wrong_count = existing.get("wrong_count", 0)
-            verify_method = existing.get("verify_method", "geetest")
-            await self.db.set(state_key, {
-                "status": "pending",
-                "question": question,
-                "answer": answer,
-                "wrong_count": wrong_count,
-                "verify_method": verify_method,
-                "max_wrong_answers": group_config["max_wrong_answers"]
-            })
+
+        stage, deadline = self._initial_verification_timer(group_config["verification_timeout"])
+        await self.db.set(state_key, {
+            "status": "pending",
+            "question": question,
+            "answer": answer,
+            "wrong_count": wrong_count,
+            "verify_method": "geetest" if verify_url_path else "math",
+            "max_wrong_answers": group_config["max_wrong_answers"],
+            "platform": platform,
+            "deadline": deadline,
+            "timer_stage": stage,
+        })
+        self._scheduler.schedule(state_key, deadline, stage, {"platform": platform, "gid": gid, "uid": uid})
 
         at_user = self._format_user_mention(event, uid)
         timeout_minutes = group_config["verification_timeout"] // 60
+        remaining_attempts = group_config["max_wrong_answers"] - wrong_count
 
-        if group_config["enable_geetest_verify"] and self.api_key:
-            try:
-                verify_url_path = await self._create_geetest_verify(gid, uid)
-                if verify_url_path:
-                    await self.db.update_field(state_key, "verify_method", "geetest")
-                    full_verify_url = f"{self.api_base_url}{verify_url_path}"
-                    if is_new_member:
-                        prompt_message = self.geetest_new_member_prompt.format(at_user=at_user, timeout=timeout_minutes, url=full_verify_url)
-                    else:
-                        current_state = self.db.get_cached(state_key) or {}
-                        wrong_count = current_state.get("wrong_count", 0)
-                        remaining_attempts = group_config["max_wrong_answers"] - wrong_count
-                        prompt_message = self.geetest_wrong_code_prompt.format(at_user=at_user, url=full_verify_url, remaining=remaining_attempts)
-                    await self._send_group_message(event, gid, prompt_message)
-                    return
-            except Exception as e:
-                logger.warning(f"[Geetest Verify] 调用极验 API 失败: {e}，回退到算术验证")
+        if verify_url_path:
+            full_verify_url = f"{self.api_base_url}{verify_url_path}"
+            if is_new_member:
+                prompt_message = self.geetest_new_member_prompt.format(at_user=at_user, timeout=timeout_minutes, url=full_verify_url)
+                await self._send_join_prompt(event, gid, prompt_message)
+                return
+            prompt_message = self.geetest_wrong_code_prompt.format(at_user=at_user, url=full_verify_url, remaining=remaining_attempts)
+            await self._send_group_message(event, gid, prompt_message)
+            return
 
-        await self.db.update_field(state_key, "verify_method", "math")
         if is_new_member:
             prompt_message = self.new_member_prompt.format(at_user=at_user, timeout=timeout_minutes, question=question)
-        else:
-            current_state = self.db.get_cached(state_key) or {}
-            wrong_count = current_state.get("wrong_count", 0)
-            remaining_attempts = group_config["max_wrong_answers"] - wrong_count
-            prompt_message = self.wrong_answer_prompt.format(at_user=at_user, question=question, remaining=remaining_attempts)
+            await self._send_join_prompt(event, gid, prompt_message)
+            return
 
+        prompt_message = self.wrong_answer_prompt.format(at_user=at_user, question=question, remaining=remaining_attempts)
         await self._send_group_message(event, gid, prompt_message)
 
-    async def _timeout_kick(self, uid: str, gid: int, timeout: int = None, event = None):
-        """处理超时踢出的协程"""
-        group_config = self._get_group_config(gid)
+    @staticmethod
+    def _initial_verification_timer(timeout: int) -> Tuple[str, float]:
+        """新一轮验证的第一个计时阶段和截止时间"""
+        now = time.time()
+        if timeout > 120:
+            return "remind", now + timeout - 60
+        return "fail", now + 60
 
-        if timeout is None:
-            timeout = group_config["verification_timeout"]
-
-        if event is None:
-            try:
-                platform_client = self.context.get_platform("aiocqhttp").get_client()
-                platform = "aiocqhttp"
-            except Exception:
-                logger.error(f"[Geetest Verify] 无法获取平台客户端，踢出流程中断 (用户 {uid})")
-                return
+    async def _arm_verification_timer(self, platform: str, gid: int, uid: str, stage: str, deadline: float):
+        """设置计时并把截止时间持久化到数据库，重启后可恢复"""
+        state_key = f"{gid}:{uid}"
+        self._scheduler.schedule(state_key, deadline, stage, {"platform": platform, "gid": gid, "uid": uid})
+        await self.db.update_fields(state_key, deadline=deadline, timer_stage=stage, platform=platform)
+
+    async def _restore_verification_timers(self):
+        """启动时恢复所有未完成的验证计时
+
+        通过 deadline 索引一次性读取持久化的截止时间；已过期的条目交给调度器按批处理。
+        旧版本遗留、没有截止时间的待验证记录按入群时间补设超时。
+        """
+        now = time.time()
+        restored = 0
+        overdue = 0
+        for state_key, gid, uid, deadline, stage, platform in await self.db.load_deadlines():
+            state = self.db.get_cached(state_key)
+            if not state or state.get("status") != "pending":
+                continue
+            stage = stage or "fail"
+            # 提醒已经没有意义时直接进入超时流程
+            if stage == "remind" and deadline + 60 <= now:
+                stage = "fail"
+            self._scheduler.schedule(state_key, deadline, stage, {"platform": platform or "aiocqhttp", "gid": gid, "uid": uid})
+            restored += 1
+            if deadline <= now:
+                overdue += 1
+
+        for state_key, gid, uid, state in self.db.pending_items():
+            if state_key in self._scheduler or state.get("status") != "pending":
+                continue
+            timeout = self._get_group_config(gid)["verification_timeout"]
+            deadline = max(now, (state.get("created_at") or now) + timeout)
+            await self._arm_verification_timer(state.get("platform") or "aiocqhttp", gid, uid, "fail", deadline)
+            restored += 1
+
+        if restored:
+            logger.info(f"[Geetest Verify] 已恢复 {restored} 个验证计时，其中 {overdue} 个已过期将分批处理")
+
+    @staticmethod
+    def _retime_verification_timer(stage: str, deadline: float, old_timeout: int, new_timeout: int) -> Tuple[str, float]:
+        """按新的超时时间换算本轮验证的当前计时，本轮的开始时间不变；已进入踢出阶段的不变"""
+        if stage == "remind":
+            started = deadline - (old_timeout - 60)
+        elif stage == "fail":
+            started = deadline - (old_timeout if old_timeout > 120 else 60)
         else:
-            platform = self._get_platform(event)
-            try:
-                platform_client = self.context.get_platform(platform).get_client()
-            except Exception as e:
-                logger.error(f"[Geetest Verify] 无法获取平台客户端 {platform}，踢出流程中断 (用户 {uid}): {e}")
-                return
-
+            return stage, deadline
+        if new_timeout <= 120:
+            return "fail", started + 60
+        if stage == "remind":
+            return "remind", started + new_timeout - 60
+        return "fail", started + new_timeout
+
+    async def _propagate_group_config_changes(self, changes: list):
+        """把群配置的变化同步到这些群的待验证用户
+
+        changes 为 (gid, 旧配置, 新配置) 列表。关闭验证的群取消全部待验证；
+        其余群更新最大错误次数，超时时间变化时只为这些用户重新计时，状态在一个事务中写入。
+        返回各群取消的待验证人数 {gid: 人数}，关闭验证的命令据此回复。
+        """
+        records = {}
+        retimed = []
+        cancelled = {}
         try:
-            if timeout > 120:
-                await asyncio.sleep(timeout - 60)
-
-                state_key = f"{gid}:{uid}"
-                if self.db.contains(state_key):
-                    at_user = f"[CQ:at,qq={uid}]" if platform == "aiocqhttp" else f"[用户](tg://user?id={uid})"
-
-                    current_state = self.db.get_cached(state_key) or {}
-                    verify_method = current_state.get("verify_method", "geetest")
-
-                    if verify_method == "geetest":
-                        verify_url_path = await self._create_geetest_verify(gid, uid)
-
-                        if verify_url_path:
-                            full_verify_url = f"{self.api_base_url}{verify_url_path}"
-                            reminder_msg = self.timeout_reminder_geetest.format(at_user=at_user, url=full_verify_url)
-                            if platform == "aiocqhttp":
-                                if hasattr(platform_client, "api"):
-                                    await platform_client.api.call_action("send_group_msg", group_id=gid, message=reminder_msg)
-                                else:
-                                    await platform_client.call_action("send_group_msg", group_id=gid, message=reminder_msg)
-                            else:
-                                if hasattr(platform_client, "call_action"):
-                                    await platform_client.call_action("send_message", chat_id=gid, text=reminder_msg, parse_mode="Markdown")
-                                else:
-                                    await platform_client.send_message(chat_id=gid, text=reminder_msg, parse_mode="Markdown")
-                            logger.info(f"[Geetest Verify] 用户 {uid} 验证剩余 1 分钟，已发送提醒")
-                        else:
-                            question, answer = self._generate_math_problem()
-                            reminder_msg = self.timeout_reminder_math.format(at_user=at_user, question=question)
-                            if platform == "aiocqhttp":
-                                if hasattr(platform_client, "api"):
-                                    await platform_client.api.call_action("send_group_msg", group_id=gid, message=reminder_msg)
-                                else:
-                                    await platform_client.call_action("send_group_msg", group_id=gid, message=reminder_msg)
-                            else:
-                                if hasattr(platform_client, "call_action"):
-                                    await platform_client.call_action("send_message", chat_id=gid, text=reminder_msg, parse_mode="Markdown")
-                                else:
-                                    await platform_client.send_message(chat_id=gid, text=reminder_msg, parse_mode="Markdown")
-                            if self.db.contains(state_key):
-                                await self.db.update_field(state_key, "verify_method", "math")
-                                await self.db.update_field(state_key, "question", question)
-                                await self.db.update_field(state_key, "answer", answer)
-                            logger.info(f"[Geetest Verify] 用户 {uid} 极验验证失败，已回退到数学题验证")
-                    else:
-                        question = current_state.get("question", "")
-                        if not question:
-                            question, answer = self._generate_math_problem()
-                            if self.db.contains(state_key):
-                                await self.db.update_field(state_key, "question", question)
-                                await self.db.update_field(state_key, "answer", answer)
-
-                        reminder_msg = self.timeout_reminder_math.format(at_user=at_user, question=question)
-                        if platform == "aiocqhttp":
-                            if hasattr(platform_client, "api"):
-                                await platform_client.api.call_action("send_group_msg", group_id=gid, message=reminder_msg)
-                            else:
-                                await platform_client.call_action("send_group_msg", group_id=gid, message=reminder_msg)
-                        else:
-                            if hasattr(platform_client, "call_action"):
-                                await platform_client.call_action("send_message", chat_id=gid, text=reminder_msg, parse_mode="Markdown")
-                            else:
-                                await platform_client.send_message(chat_id=gid, text=reminder_msg, parse_mode="Markdown")
-                        logger.info(f"[Geetest Verify] 用户 {uid} 验证剩余 1 分钟，已发送数学题提醒")
-
-            await asyncio.sleep(60)
-
-            state_key = f"{gid}:{uid}"
-            if not self.db.contains(state_key):
-                return
-
-            at_user = f"[CQ:at,qq={uid}]" if platform == "aiocqhttp" else f"[用户](tg://user?id={uid})"
+            for gid, old, new in changes:
+                if old["enabled"] and not new["enabled"]:
+                    cancelled[gid] = await self._bulk_group_pending(gid, "cancel")
+                    continue
+                max_wrong_answers = new["max_wrong_answers"]
+                old_timeout = old["verification_timeout"]
+                new_timeout = new["verification_timeout"]
+                for key in self.db.group_pending_keys(gid):
+                    state = self.db.get_cached(key)
+                    if state is None:
+                        continue
+                    if state.get("max_wrong_answers") != max_wrong_answers:
+                        state["max_wrong_answers"] = max_wrong_answers
+                        records[key] = state
+                    entry = self._scheduler.get(key) if old_timeout != new_timeout else None
+                    if entry is None or entry.stage == "kick":
+                        continue
+                    stage, deadline = self._retime_verification_timer(entry.stage, entry.deadline, old_timeout, new_timeout)
+                    # 先替换计时，之后的配置变化以新的计时为准
+                    self._scheduler.schedule(key, deadline, stage, entry.payload)
+                    state["deadline"] = deadline
+                    state["timer_stage"] = stage
+                    records[key] = state
+                    retimed.append(key)
+
+            await self.db.set_many(records)
+        except Exception as e:
+            logger.error(f"[Geetest Verify] 同步配置到待验证用户失败: {e}")
+            return cancelled
+
+        logger.info(
+            f"[Geetest Verify] 配置变化已同步到 {len(changes)} 个群：更新 {len(records)} 条待验证状态，"
+            f"重新计时 {len(retimed)} 个，取消 {sum(cancelled.values())} 个"
+        )
+        return cancelled
+
+    async def _bulk_group_pending(self, gid: int, action: str) -> int:
+        """对某个群的所有待验证用户执行批量操作，返回处理的人数
+
+        cancel 取消验证（不再踢出），approve 直接标记为已验证，reissue 重新出题并重新计时。
+        通过按群的待验证索引取键，计时批量取消，状态在一个事务中写入，开销只与该群的待验证人数有关。
+        """
+        if action not in _PENDING_ACTION_NAMES:
+            raise ValueError(f"Unknown pending action: {action}")
+        keys = self.db.group_pending_keys(gid)
+        if not keys:
+            return 0
 
-            kick_delay = group_config.get("kick_delay", self.kick_delay)
+        self._scheduler.cancel_many(keys)
+        if action == "cancel":
+            await self.db.delete_many(keys)
+        elif action == "approve":
+            now = time.time()
+            await self.db.set_many({key: {"status": "verified", "verify_time": now} for key in keys})
+        else:
+            await self._reissue_group_pending(gid, keys)
 
-            failure_msg = self.failure_message.format(at_user=at_user, countdown=kick_delay)
-            if platform == "aiocqhttp":
-                if hasattr(platform_client, "api"):
-                    await platform_client.api.call_action("send_group_msg", group_id=gid, message=failure_msg)
-                else:
-                    await platform_client.call_action("send_group_msg", group_id=gid, message=failure_msg)
-            else:
-                if hasattr(platform_client, "call_action"):
-                    await platform_client.call_action("send_message", chat_id=gid, text=failure_msg, parse_mode="Markdown")
-                else:
-                    await platform_client.send_message(chat_id=gid, text=failure_msg, parse_mode="Markdown")
+        logger.info(f"[Geetest Verify] 群 {gid} 已批量{_PENDING_ACTION_NAMES[action]} {len(keys)} 名待验证用户")
+        return len(keys)
 
-            await asyncio.sleep(kick_delay)
+    async def _reissue_group_pending(self, gid: int, keys: list):
+        """为一批待验证用户重新出题、重置错误次数并按当前群配置重新计时
 
-            if not self.db.contains(state_key):
-                return
+        批量重发统一使用算术验证，不为每个用户单独请求极验链接。
+        """
+        group_config = self._get_group_config(gid)
+        timeout = group_config["verification_timeout"]
+        stage, deadline = self._initial_verification_timer(timeout)
+
+        records = {}
+        prompts = []
+        for key in keys:
+            state = self.db.get_cached(key)
+            if state is None:
+                continue
+            uid = key.partition(":")[2]
+            platform = state.get("platform") or "aiocqhttp"
+            question, answer = self._generate_math_problem()
+            records[key] = {
+                "status": "pending",
+                "question": question,
+                "answer": answer,
+                "wrong_count": 0,
+                "verify_method": "math",
+                "max_wrong_answers": group_config["max_wrong_answers"],
+                "platform": platform,
+                "deadline": deadline,
+                "timer_stage": stage,
+            }
+            prompts.append((key, platform, uid, question))
+
+        await self.db.set_many(records)
+
+        timeout_minutes = timeout // 60
+        for key, platform, uid, question in prompts:
+            self._scheduler.schedule(key, deadline, stage, {"platform": platform, "gid": gid, "uid": uid})
+            at_user = self._format_user_mention_by_id(platform, uid)
+            prompt_message = self.new_member_prompt.format(at_user=at_user, timeout=timeout_minutes, question=question)
+            # 出站队列会把排队中的提示合并发送
+            await self._post_platform_message(platform, gid, prompt_message)
+
+    def _list_group_pending(self, gid: int, limit: int = 100) -> dict:
+        """列出某个群的待验证用户（按入群时间排序），只读内存"""
+        items = []
+        for key in self.db.group_pending_keys(gid):
+            state = self.db.get_cached(key)
+            if state is None:
+                continue
+            items.append({
+                "user_id": key.partition(":")[2],
+                "platform": state.get("platform"),
+                "verify_method": state.get("verify_method"),
+                "wrong_count": state.get("wrong_count", 0),
+                "created_at": state.get("created_at"),
+                "deadline": state.get("deadline"),
+                "timer_stage": state.get("timer_stage"),
+            })
+        items.sort(key=lambda item: item["created_at"] or 0)
+        return {"group_id": gid, "total": len(items), "items": items[:limit]}
 
-            await self._kick_member(event, gid, uid)
+    async def _checkpoint_verification_timers(self):
+        """卸载时保存所有未触发计时的检查点"""
+        entries = self._scheduler.entries()
+        await self.db.save_deadlines([(entry.key, entry.deadline, entry.stage) for entry in entries])
+        return len(entries)
 
-            logger.info(f"[Geetest Verify] 用户 {uid} 验证超时，已从群 {gid} 踢出")
+    async def _on_verification_deadline(self, entry: TimerEntry):
+        """调度器回调：根据阶段处理提醒、超时通知和踢出"""
+        platform = entry.payload["platform"]
+        gid = entry.payload["gid"]
+        uid = entry.payload["uid"]
+        state_key = entry.key
 
-            await self.db.delete(state_key)
-            self._tasks.pop(state_key, None)
+        if not self.db.contains(state_key):
+            return
 
-            try:
+        try:
+            if entry.stage == "remind":
+                # 先设好超时计时，提醒发送失败也不会让用户一直停留在待验证状态
+                if state_key not in self._scheduler:
+                    await self._arm_verification_timer(platform, gid, uid, "fail", entry.deadline + 60)
+                await self._send_timeout_reminder(platform, gid, uid)
+            elif entry.stage == "fail":
+                group_config = self._get_group_config(gid)
+                kick_delay = group_config.get("kick_delay", self.kick_delay)
+                # 先设好踢出计时；通知在后台放入出站队列，群队列积压（限速或背压）不会占住调度批次
+                if state_key not in self._scheduler:
+                    await self._arm_verification_timer(platform, gid, uid, "kick", time.time() + kick_delay)
+                at_user = self._format_user_mention_by_id(platform, uid)
+                failure_msg = self.failure_message.format(at_user=at_user, countdown=kick_delay)
+                task = asyncio.create_task(self._post_platform_message(platform, gid, failure_msg))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            elif entry.stage == "kick":
+                at_user = self._format_user_mention_by_id(platform, uid)
                 kick_msg = self.kick_message.format(at_user=at_user)
-                if platform == "aiocqhttp":
-                    if hasattr(platform_client, "api"):
-                        await platform_client.api.call_action("send_group_msg", group_id=gid, message=kick_msg)
-                    else:
-                        await platform_client.call_action("send_group_msg", group_id=gid, message=kick_msg)
-                else:
-                    if hasattr(platform_client, "call_action"):
-                        await platform_client.call_action("send_message", chat_id=gid, text=kick_msg, parse_mode="Markdown")
-                    else:
-                        await platform_client.send_message(chat_id=gid, text=kick_msg, parse_mode="Markdown")
-            except Exception as e:
-                logger.warning(f"[Geetest Verify] 发送踢出通知消息失败 (用户 {uid}): {e}")
+                await self._outbox.enqueue(platform, gid, uid, "kick", {"notice": kick_msg})
+
+                logger.info(f"[Geetest Verify] 用户 {uid} 验证超时，将从群 {gid} 踢出")
 
-        except asyncio.CancelledError:
-            logger.info(f"[Geetest Verify] 踢出任务已取消 (用户 {uid})")
+                await self.db.delete(state_key)
         except Exception as e:
             logger.error(f"[Geetest Verify] 踢出流程发生错误 (用户 {uid}): {e}")
 
+    async def _send_timeout_reminder(self, platform: str, gid: int, uid: str):
+        """验证剩余 1 分钟时发送提醒"""
+        state_key = f"{gid}:{uid}"
+        at_user = self._format_user_mention_by_id(platform, uid)
+
+        current_state = self.db.get_cached(state_key) or {}
+        verify_method = current_state.get("verify_method", "geetest")
+
+        if verify_method == "geetest":
+            verify_url_path = await self._create_geetest_verify(gid, uid)
+
+            if verify_url_path:
+                full_verify_url = f"{self.api_base_url}{verify_url_path}"
+                reminder_msg = self.timeout_reminder_geetest.format(at_user=at_user, url=full_verify_url)
+                await self._send_platform_message(platform, gid, reminder_msg)
+                logger.info(f"[Geetest Verify] 用户 {uid} 验证剩余 1 分钟，已发送提醒")
+            else:
+                question, answer = self._generate_math_problem()
+                reminder_msg = self.timeout_reminder_math.format(at_user=at_user, question=question)
+                await self._send_platform_message(platform, gid, reminder_msg)
+                if self.db.contains(state_key):
+                    await self.db.update_field(state_key, "verify_method", "math")
+                    await self.db.update_field(state_key, "question", question)
+                    await self.db.update_field(state_key, "answer", answer)
+                logger.info(f"[Geetest Verify] 用户 {uid} 极验验证失败，已回退到数学题验证")
+        else:
+            question = current_state.get("question", "")
+            if not question:
+                question, answer = self._generate_math_problem()
+                if self.db.contains(state_key):
+                    await self.db.update_field(state_key, "question", question)
+                    await self.db.update_field(state_key, "answer", answer)
+
+            reminder_msg = self.timeout_reminder_math.format(at_user=at_user, question=question)
+            await self._send_platform_message(platform, gid, reminder_msg)
+            logger.info(f"[Geetest Verify] 用户 {uid} 验证剩余 1 分钟，已发送数学题提醒")
+
+    def _init_level_cache(self):
+        """初始化 QQ 等级缓存（LRU + TTL）和并发查询合并"""
+        self._level_cache = TTLCache(maxsize=_LEVEL_CACHE_SIZE, ttl=self.level_cache_ttl)
+        self._level_flight = SingleFlight()
+        self._level_semaphore = asyncio.Semaphore(_LEVEL_LOOKUP_CONCURRENCY)
+
+    def get_level_cache_stats(self) -> dict:
+        stats = self._level_cache.get_stats()
+        stats["shared_lookups"] = self._level_flight.shared
+        return stats
+
     async def _get_user_level(self, uid: str) -> int:
-        """获取用户QQ等级"""
+        """获取用户QQ等级，优先使用缓存；同一用户的并发查询只调用一次 API"""
+        uid = str(uid)
+        qq_level = self._level_cache.get(uid)
+        if qq_level is not None:
+            logger.debug(f"[Geetest Verify] 用户 {uid} 的QQ等级命中缓存: {qq_level}")
+            return qq_level
+
         try:
+            return await self._level_flight.do(uid, lambda: self._fetch_user_level(uid))
+        except Exception as e:
+            logger.error(f"[Geetest Verify] 获取用户 {uid} 的QQ等级失败: {e}")
+            return 0
+
+    async def _fetch_user_level(self, uid: str) -> int:
+        """调用 get_stranger_info 查询等级并写入缓存，失败时抛出异常（不缓存）"""
+        async with self._level_semaphore:
             user_info = await self.context.get_platform("aiocqhttp").get_client().api.call_action("get_stranger_info", user_id=int(uid))
-            logger.info(f"[Geetest Verify] 用户 {uid} 的API返回数据: {user_info}")
+        logger.debug(f"[Geetest Verify] 用户 {uid} 的API返回数据: {user_info}")
 
-            qq_level = 0
-            for key in user_info.keys():
+        qq_level = 0
+        for key in user_info.keys():
+            if key.lower() == "qqlevel":
+                qq_level = user_info[key]
+                break
+
+        if qq_level == 0 and isinstance(user_info.get("data"), dict):
+            for key in user_info["data"].keys():
                 if key.lower() == "qqlevel":
-                    qq_level = user_info[key]
+                    qq_level = user_info["data"][key]
                     break
 
-            if qq_level == 0 and isinstance(user_info.get("data"), dict):
-                for key in user_info["data"].keys():
-                    if key.lower() == "qqlevel":
-                        qq_level = user_info["data"][key]
-                        break
+        self._level_cache.set(uid, qq_level)
+        logger.info(f"[Geetest Verify] 用户 {uid} 的QQ等级为: {qq_level}")
+        return qq_level
+
+    def _prefetch_user_levels(self, uids):
+        """在后台预先查询一批用户的等级，已缓存或正在查询的用户跳过"""
+        for uid in uids:
+            uid = str(uid)
+            if uid in self._level_cache or uid in self._level_flight:
+                continue
+            task = asyncio.create_task(self._get_user_level(uid))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    def _init_admin_roster(self):
+        """初始化群管理员名单缓存，以及名单不可用时按用户查询的缓存"""
+        self._admin_rosters = TTLCache(maxsize=_ADMIN_ROSTER_SIZE, ttl=_ADMIN_ROSTER_TTL)
+        self._admin_roster_flight = SingleFlight()
+        self._member_admin_cache = TTLCache(maxsize=_LEVEL_CACHE_SIZE, ttl=_ADMIN_ROSTER_TTL)
+        self._member_admin_flight = SingleFlight()
+
+    async def _get_admin_roster(self, platform: str, gid: int):
+        """获取群管理员（含群主）用户 ID 集合，获取失败返回 None"""
+        key = (platform, gid)
+        roster = self._admin_rosters.get(key)
+        if roster is not None:
+            return roster
+        try:
+            return await self._admin_roster_flight.do(key, lambda: self._fetch_admin_roster(platform, gid))
+        except Exception as e:
+            logger.warning(f"[Geetest Verify] 获取群 {gid} 管理员列表失败: {e}")
+            return None
 
-            logger.info(f"[Geetest Verify] 用户 {uid} 的QQ等级为: {qq_level}")
-            return qq_level
+    async def _fetch_admin_roster(self, platform: str, gid: int) -> frozenset:
+        platform_client = self._get_platform_client(platform, gid)
+        if platform == "telegram":
+            if hasattr(platform_client, "call_action"):
+                admins = await platform_client.call_action("getChatAdministrators", chat_id=gid)
+            else:
+                admins = await platform_client.get_chat_administrators(chat_id=gid)
+            roster = frozenset(
+                str(self._get_raw_value(self._get_raw_value(admin, "user") or {}, "id"))
+                for admin in admins or []
+            )
+        else:
+            if hasattr(platform_client, "api"):
+                members = await platform_client.api.call_action("get_group_member_list", group_id=gid)
+            else:
+                members = await platform_client.call_action("get_group_member_list", group_id=gid)
+            if isinstance(members, dict):
+                members = members.get("data") or []
+            roster = frozenset(
+                str(member.get("user_id")) for member in members or []
+                if member.get("role") in ("admin", "owner")
+            )
+
+        self._admin_rosters.set((platform, gid), roster)
+        logger.debug(f"[Geetest Verify] 已缓存群 {gid} 的 {len(roster)} 名管理员")
+        return roster
+
+    async def _is_member_admin(self, platform: str, gid: int, uid: str) -> bool:
+        """管理员名单不可用时，单独查询某个用户的身份（同一用户的并发查询只调用一次 API）"""
+        key = (platform, gid, uid)
+        is_admin = self._member_admin_cache.get(key)
+        if is_admin is not None:
+            return is_admin
+        try:
+            return await self._member_admin_flight.do(key, lambda: self._fetch_member_admin(platform, gid, uid))
         except Exception as e:
-            logger.error(f"[Geetest Verify] 获取用户 {uid} 的QQ等级失败: {e}")
-            return 0
+            logger.warning(f"[Geetest Verify] 获取用户 {uid} 在群 {gid} 的权限失败: {e}")
+            return False
+
+    async def _fetch_member_admin(self, platform: str, gid: int, uid: str) -> bool:
+        platform_client = self._get_platform_client(platform, gid)
+        if platform == "telegram":
+            if hasattr(platform_client, "call_action"):
+                chat_member = await platform_client.call_action("getChatMember", chat_id=gid, user_id=int(uid))
+            else:
+                chat_member = await platform_client.get_chat_member(chat_id=gid, user_id=int(uid))
+            is_admin = self._get_raw_value(chat_member, "status", "member") in ("administrator", "creator")
+        else:
+            if hasattr(platform_client, "api"):
+                member = await platform_client.api.call_action("get_group_member_info", group_id=gid, user_id=int(uid))
+            else:
+                member = await platform_client.call_action("get_group_member_info", group_id=gid, user_id=int(uid))
+            is_admin = (member or {}).get("role") in ("admin", "owner")
+
+        self._member_admin_cache.set((platform, gid, uid), is_admin)
+        return is_admin
+
+    def _apply_admin_change(self, platform: str, gid: int, uid: str, is_admin: bool):
+        """收到管理员变更通知时直接更新缓存的名单，无需重新拉取"""
+        uid = str(uid)
+        key = (platform, gid)
+        roster = self._admin_rosters.pop(key)
+        if roster is not None:
+            self._admin_rosters.set(key, roster | {uid} if is_admin else roster - {uid})
+        self._member_admin_cache.pop((platform, gid, uid))
+        logger.info(f"[Geetest Verify] 群 {gid} 用户 {uid} 管理员身份变更为: {'管理员' if is_admin else '普通成员'}")
 
     async def _check_permission(self, event) -> bool:
         """检查用户权限（bot管理员、群主、管理员才可使用）"""
@@ -271,31 +526,28 @@ class VerifyMixin:
 
         if platform == "telegram":
             from_user = self._get_raw_value(raw_message, "from") or {}
-            gid = self._get_group_id(platform, raw_message)
-            if gid is None:
-                logger.warning("[Geetest Verify] 无法获取群组 ID，权限检查失败")
+            uid = self._get_raw_value(from_user, "id")
+        else:
+            # QQ 群消息自带发送者身份，无需查询
+            sender = self._get_raw_value(raw_message, "sender") or {}
+            sender_role = self._get_raw_value(sender, "role")
+            if sender_role:
+                if sender_role in ["admin", "owner"]:
+                    logger.debug(f"用户为{sender_role}，跳过权限检查")
+                    return True
                 return False
+            uid = self._get_raw_value(raw_message, "user_id")
 
-            try:
-                platform_client = self.context.get_platform(platform).get_client()
-                chat_member = None
-                if hasattr(platform_client, "call_action"):
-                    chat_member = await platform_client.call_action("getChatMember", chat_id=gid, user_id=self._get_raw_value(from_user, "id"))
-                else:
-                    chat_member = await platform_client.get_chat_member(chat_id=gid, user_id=self._get_raw_value(from_user, "id"))
-
-                status = self._get_raw_value(chat_member, "status", "member")
-                if status in ["administrator", "creator"]:
-                    logger.debug(f"用户为{status}，跳过权限检查")
-                    return True
-            except Exception as e:
-                logger.warning(f"[Geetest Verify] 获取 Telegram 用户权限失败: {e}")
-        else:
-            sender_dict = self._get_raw_dict(raw_message) if raw_message else {}
-            sender = sender_dict.get("sender", {}) if sender_dict else {}
-            sender_role = sender.get("role", "member")
-            if sender_role in ["admin", "owner"]:
-                logger.debug(f"用户为{sender_role}，跳过权限检查")
-                return True
-
-        return False
+        if not uid:
+            uid = event.get_sender_id()
+        uid = str(uid)
+
+        gid = self._get_group_id(platform, raw_message)
+        if gid is None:
+            logger.warning("[Geetest Verify] 无法获取群组 ID，权限检查失败")
+            return False
+
+        roster = await self._get_admin_roster(platform, gid)
+        if roster is not None:
+            return uid in roster
+        return await self._is_member_admin(platform, gid, uid)
@@ -1,5 +1,6 @@
 import asyncio
 import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional
 
@@ -7,27 +8,147 @@ import aiosqlite
 
 from astrbot.api import logger
 
+from .state import StateRecord
+
+
+_UPSERT_SQL = """
+    INSERT INTO member_states(group_id, user_id, status, question, answer, wrong_count, verify_method, max_wrong_answers, verify_time, created_at, platform, deadline, timer_stage)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(group_id, user_id) DO UPDATE SET
+        status=excluded.status,
+        question=excluded.question,
+        answer=excluded.answer,
+        wrong_count=excluded.wrong_count,
+        verify_method=excluded.verify_method,
+        max_wrong_answers=excluded.max_wrong_answers,
+        verify_time=excluded.verify_time,
+        created_at=excluded.created_at,
+        platform=excluded.platform,
+        deadline=excluded.deadline,
+        timer_stage=excluded.timer_stage;
+"""
+
+_DELETE_SQL = "DELETE FROM member_states WHERE group_id = ? AND user_id = ?"
+
+_FIELD_COLUMNS = ", ".join(StateRecord.FIELDS)
+_SELECT_COLUMNS = "group_id, user_id, " + _FIELD_COLUMNS
+
+# 已验证/已绕过等非待验证状态不常驻内存，按需查询后放入有界 LRU
+_COLD_CACHE_SIZE = 10000
+# LRU 中表示“数据库中没有该记录”的占位
+_MISSING = object()
+
+# 过期清理：默认各状态保留时长（秒）、清理间隔，以及每次增量回收的最大页数
+_DEFAULT_RETENTION = {"verified": 86400, "bypassed": 86400}
+_MIN_SWEEP_INTERVAL = 60.0
+_VACUUM_PAGES = 2000
+
+_SAVE_DEADLINE_SQL = "UPDATE member_states SET deadline = ?, timer_stage = ? WHERE group_id = ? AND user_id = ?"
+
+# 旧版以 "gid:uid" 文本为主键的 verify_states 表：启动时先迁移待验证记录，其余记录在后台分批迁移
+_LEGACY_DELETE_SQL = "DELETE FROM verify_states WHERE state_key = ?"
+# 新表中已有的记录是迁移开始后写入的，比旧表新，保留新表中的
+_MIGRATE_INSERT_SQL = """
+    INSERT OR IGNORE INTO member_states(group_id, user_id, status, question, answer, wrong_count, verify_method, max_wrong_answers, verify_time, created_at, platform, deadline, timer_stage)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_MIGRATE_BATCH = 5000
+_MIGRATE_PAUSE = 0.05
+
+_PLATFORMS = ("aiocqhttp", "telegram")
+
+# 动作发件箱：idem_key 为 gid:uid:action（撤回附带消息 ID），重复入队会被忽略
+_ENQUEUE_ACTION_SQL = """
+    INSERT OR IGNORE INTO action_outbox(idem_key, platform, gid, uid, action, payload, not_before, attempts, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)
+"""
+
+# 旧版本 verify_states 表缺少的列，迁移前按需补齐
+_MIGRATION_COLUMNS = {
+    "platform": "TEXT",
+    "deadline": "REAL",
+    "timer_stage": "TEXT",
+}
+
 
 class VerifyStateDB:
-    def __init__(self, db_path: Path):
+    def __init__(self, db_path: Path, write_behind: bool = False, flush_interval: float = 1.0,
+                 retention: Optional[dict] = None, sweep_interval: float = 3600.0):
         self.db_path = db_path
         self._conn: Optional[aiosqlite.Connection] = None
+        # 常驻内存的只有待验证状态；其余状态按需查询，最近用过的保存在 _cold 中
         self._cache: dict = {}
+        self._cold: "OrderedDict[str, object]" = OrderedDict()
+        # 待验证索引：(platform, gid, uid) 三元组，供群消息快速判断发送者是否需要验证
+        self._pending_index: set = set()
+        self._pending_keys: dict = {}
+        # 按群分组的待验证状态键：gid -> {state_key}，供按群统计与批量操作
+        self._pending_by_group: dict = {}
         self._initialized = False
         self._init_lock = asyncio.Lock()
 
+        # 延迟写入（write-behind）：只记录脏键，由后台任务按窗口合并为一个事务提交
+        self._write_behind = write_behind
+        self._flush_interval = max(0.05, float(flush_interval))
+        # 脏键 -> 待写入的记录（非待验证的记录在写入前可能已被 LRU 淘汰，因此保存引用）
+        self._dirty: dict = {}
+        self._deleted: set = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # 过期清理：状态 -> 保留秒数（0 表示永久保留），由后台任务按间隔执行
+        self._retention = dict(_DEFAULT_RETENTION if retention is None else retention)
+        self._sweep_interval = max(_MIN_SWEEP_INTERVAL, float(sweep_interval))
+        self._sweep_wakeup: Optional[asyncio.Event] = None
+        self._sweep_task: Optional[asyncio.Task] = None
+
+        # 旧表迁移：迁移完成前，查询未命中时回退到旧表，删除时同时删除旧表中的行
+        self._legacy = False
+        self._migrate_task: Optional[asyncio.Task] = None
+        self._stats = {
+            "writes": 0,
+            "commits": 0,
+            "flushes": 0,
+            "rows_flushed": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+            "flush_errors": 0,
+            "cold_hits": 0,
+            "cold_queries": 0,
+            "sweeps": 0,
+            "swept_rows": 0,
+            "vacuumed_pages": 0,
+            "migrated_rows": 0,
+            "migrate_skipped": 0,
+        }
+
     async def init(self):
         async with self._init_lock:
             if self._initialized:
                 return
 
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            await self._enable_incremental_vacuum()
             self._conn = await aiosqlite.connect(str(self.db_path))
             self._conn.row_factory = aiosqlite.Row
+            # 新数据库在建表前设置即可生效，已有数据库上无副作用
+            await self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+
+            if self._write_behind:
+                await self._conn.execute("PRAGMA journal_mode=WAL;")
+                await self._conn.execute("PRAGMA synchronous=NORMAL;")
+                await self._conn.execute("PRAGMA temp_store=MEMORY;")
+                await self._conn.execute("PRAGMA cache_size=-8000;")
+                await self._conn.execute("PRAGMA busy_timeout=5000;")
 
+            # 群号、用户 ID 为整数列，(group_id, user_id) 为聚簇主键，同一个群的记录在 B 树中相邻
             await self._conn.execute("""
-                CREATE TABLE IF NOT EXISTS verify_states (
-                    state_key TEXT PRIMARY KEY,
+                CREATE TABLE IF NOT EXISTS member_states (
+                    group_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
                     status TEXT NOT NULL,
                     question TEXT,
                     answer INTEGER,
@@ -35,110 +156,705 @@ class VerifyStateDB:
                     verify_method TEXT,
                     max_wrong_answers INTEGER DEFAULT 5,
                     verify_time REAL,
+                    created_at REAL,
+                    platform TEXT,
+                    deadline REAL,
+                    timer_stage TEXT,
+                    PRIMARY KEY (group_id, user_id)
+                ) WITHOUT ROWID;
+            """)
+            # 按群统计、列出、批量处理某一状态的记录
+            await self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_member_states_group_status ON member_states(group_id, status);"
+            )
+            # 启动时加载待验证状态、过期清理按 (状态, 创建时间) 范围删除
+            await self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_member_states_status_created ON member_states(status, created_at);"
+            )
+            await self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_member_states_deadline ON member_states(deadline) WHERE deadline IS NOT NULL;"
+            )
+            await self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS action_outbox (
+                    idem_key TEXT PRIMARY KEY,
+                    platform TEXT NOT NULL,
+                    gid INTEGER NOT NULL,
+                    uid TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    payload TEXT,
+                    not_before REAL NOT NULL,
+                    attempts INTEGER DEFAULT 0,
+                    last_error TEXT,
                     created_at REAL
                 );
             """)
+            await self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_action_outbox_not_before ON action_outbox(not_before);"
+            )
             await self._conn.commit()
 
-            async with self._conn.execute("SELECT * FROM verify_states;") as cur:
+            async with self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'verify_states';"
+            ) as cur:
+                self._legacy = await cur.fetchone() is not None
+            if self._legacy:
+                await self._migrate_columns()
+                await self._migrate_legacy_pending()
+
+            async with self._conn.execute(
+                f"SELECT {_SELECT_COLUMNS} FROM member_states WHERE status = 'pending';"
+            ) as cur:
                 async for row in cur:
-                    self._cache[row["state_key"]] = {
-                        "status": row["status"],
-                        "question": row["question"],
-                        "answer": row["answer"],
-                        "wrong_count": row["wrong_count"],
-                        "verify_method": row["verify_method"],
-                        "max_wrong_answers": row["max_wrong_answers"],
-                        "verify_time": row["verify_time"],
-                        "created_at": row["created_at"],
-                    }
+                    state_key = f"{row['group_id']}:{row['user_id']}"
+                    record = self._cache[state_key] = StateRecord.from_row(row)
+                    self._reindex(state_key, record)
+
+            if self._legacy:
+                self._migrate_task = asyncio.create_task(self._migrate_legacy())
+            if self._write_behind:
+                self._flush_task = asyncio.create_task(self._flush_loop())
+            self._sweep_wakeup = asyncio.Event()
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
 
             self._initialized = True
-            logger.info(f"[Geetest Verify] 初始化验证状态数据库 ({len(self._cache)} 个状态)")
+            mode = "延迟写入" if self._write_behind else "同步写入"
+            logger.info(f"[Geetest Verify] 初始化验证状态数据库 ({len(self._cache)} 个待验证状态, {mode})")
+
+    async def _enable_incremental_vacuum(self):
+        """在打开主连接、开始服务之前，用单独的连接为已有数据库开启增量回收
+
+        已有数据库需要执行一次 VACUUM 重写整个文件，只在启动时执行，不与运行中的读写争用连接。
+        旧表尚未迁移完的数据库保持原样，迁移完成后的下次启动再转换。
+        """
+        if not self.db_path.exists():
+            return
+        async with aiosqlite.connect(str(self.db_path)) as conn:
+            await conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+            async with conn.execute("PRAGMA auto_vacuum;") as cur:
+                row = await cur.fetchone()
+            if row and row[0] == 2:
+                return
+            async with conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'verify_states';"
+            ) as cur:
+                if await cur.fetchone() is not None:
+                    logger.info("[Geetest Verify] 旧版验证状态尚未迁移完成，迁移完成后的下次启动时开启增量空间回收")
+                    return
+            logger.info("[Geetest Verify] 正在为验证状态数据库开启增量空间回收（一次性 VACUUM）")
+            start = time.perf_counter()
+            try:
+                await conn.execute("VACUUM;")
+            except aiosqlite.Error as e:
+                logger.warning(f"[Geetest Verify] 开启增量空间回收失败，下次启动时重试: {e}")
+                return
+        logger.info(f"[Geetest Verify] 验证状态数据库已开启增量空间回收，耗时 {time.perf_counter() - start:.1f} 秒")
+
+    async def _migrate_legacy_pending(self):
+        """启动时先把旧表中的待验证记录迁移到新表，保证它们能被加载和恢复计时"""
+        async with self._conn.execute(
+            f"SELECT rowid, state_key, {_FIELD_COLUMNS} FROM verify_states WHERE status = 'pending';"
+        ) as cur:
+            rows = await cur.fetchall()
+        if not rows:
+            return
+        await self._move_legacy_rows(rows)
+        await self._conn.executemany("DELETE FROM verify_states WHERE rowid = ?;", [(row["rowid"],) for row in rows])
+        await self._conn.commit()
+        logger.info(f"[Geetest Verify] 已迁移 {len(rows)} 条待验证状态到新表")
+
+    async def _migrate_legacy(self):
+        """后台按 rowid 分批迁移旧表中的其余记录，每批一个事务，全部迁移后删除旧表"""
+        try:
+            while True:
+                async with self._flush_lock:
+                    async with self._conn.execute(
+                        f"SELECT rowid, state_key, {_FIELD_COLUMNS} FROM verify_states ORDER BY rowid LIMIT ?;",
+                        (_MIGRATE_BATCH,),
+                    ) as cur:
+                        rows = await cur.fetchall()
+                    if not rows:
+                        await self._conn.execute("DROP TABLE verify_states;")
+                        await self._conn.commit()
+                        self._legacy = False
+                        break
+                    await self._move_legacy_rows(rows)
+                    await self._conn.execute("DELETE FROM verify_states WHERE rowid <= ?;", (rows[-1]["rowid"],))
+                    await self._conn.commit()
+                    self._stats["commits"] += 1
+                # 批次之间让出事件循环，不阻塞正常的读写
+                await asyncio.sleep(_MIGRATE_PAUSE)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[Geetest Verify] 迁移旧版验证状态失败，将在下次启动时继续: {e}")
+            return
+        logger.info(
+            f"[Geetest Verify] 旧版验证状态迁移完成：迁移 {self._stats['migrated_rows']} 条，"
+            f"跳过无法解析的 {self._stats['migrate_skipped']} 条"
+        )
 
-    async def _save_to_db(self, state_key: str, data: dict):
+    async def _move_legacy_rows(self, rows: list):
+        batch = []
+        for row in rows:
+            try:
+                batch.append(self._to_row(row["state_key"], StateRecord.from_row(row)))
+            except ValueError:
+                self._stats["migrate_skipped"] += 1
+        if batch:
+            await self._conn.executemany(_MIGRATE_INSERT_SQL, batch)
+        self._stats["migrated_rows"] += len(batch)
+
+    async def _migrate_columns(self):
+        async with self._conn.execute("PRAGMA table_info(verify_states);") as cur:
+            existing = {row["name"] async for row in cur}
+        for column, column_type in _MIGRATION_COLUMNS.items():
+            if column not in existing:
+                await self._conn.execute(f"ALTER TABLE verify_states ADD COLUMN {column} {column_type};")
+                logger.info(f"[Geetest Verify] 验证状态数据库已添加字段 {column}")
+
+    @staticmethod
+    def _split_key(state_key: str) -> tuple:
+        """把 "gid:uid" 拆成整数 (group_id, user_id)，格式不对时抛出 ValueError"""
+        gid, sep, uid = state_key.partition(":")
+        if not sep:
+            raise ValueError(f"Invalid state key: {state_key!r}")
+        return int(gid), int(uid)
+
+    @classmethod
+    def _to_row(cls, state_key: str, data: StateRecord) -> tuple:
+        return (
+            *cls._split_key(state_key),
+            data.get("status", "pending"),
+            data.get("question"),
+            data.get("answer"),
+            data.get("wrong_count", 0),
+            data.get("verify_method"),
+            data.get("max_wrong_answers", 5),
+            data.get("verify_time"),
+            data.get("created_at"),
+            data.get("platform"),
+            data.get("deadline"),
+            data.get("timer_stage"),
+        )
+
+    def _reindex(self, state_key: str, data: Optional[StateRecord]):
+        old = self._pending_keys.pop(state_key, None)
+        if old:
+            self._pending_index.difference_update(old)
+            group = self._pending_by_group.get(old[0][1])
+            if group is not None:
+                group.discard(state_key)
+                if not group:
+                    del self._pending_by_group[old[0][1]]
+        if not data or data.get("status") != "pending":
+            return
+        gid, _, uid = state_key.partition(":")
+        try:
+            gid = int(gid)
+        except ValueError:
+            return
+        platform = data.get("platform")
+        # 旧版本记录没有平台信息，两个平台都登记
+        triples = tuple((p, gid, uid) for p in ((platform,) if platform else _PLATFORMS))
+        self._pending_keys[state_key] = triples
+        self._pending_index.update(triples)
+        self._pending_by_group.setdefault(gid, set()).add(state_key)
+
+    def is_pending(self, platform: str, gid: int, uid: str) -> bool:
+        """O(1) 判断某平台某群的用户是否处于待验证状态"""
+        return (platform, gid, uid) in self._pending_index
+
+    def has_pending(self) -> bool:
+        return bool(self._pending_index)
+
+    def _place(self, state_key: str, record: Optional[StateRecord]):
+        """待验证状态放入常驻表，其余状态（以及已删除的占位）放入有界 LRU"""
+        if record is not None and record.status == "pending":
+            self._cache[state_key] = record
+            self._cold.pop(state_key, None)
+            return
+        self._cache.pop(state_key, None)
+        self._cold[state_key] = _MISSING if record is None else record
+        self._cold.move_to_end(state_key)
+        while len(self._cold) > _COLD_CACHE_SIZE:
+            self._cold.popitem(last=False)
+
+    async def _save_to_db(self, state_key: str, data: StateRecord):
+        # 提前校验键的格式，避免延迟写入时整批失败
+        self._split_key(state_key)
+        self._place(state_key, data)
+        self._reindex(state_key, data)
         if not self._conn:
             raise RuntimeError("VerifyStateDB not initialized")
 
-        await self._conn.execute(
-            """
-            INSERT INTO verify_states(state_key, status, question, answer, wrong_count, verify_method, max_wrong_answers, verify_time, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(state_key) DO UPDATE SET
-                status=excluded.status,
-                question=excluded.question,
-                answer=excluded.answer,
-                wrong_count=excluded.wrong_count,
-                verify_method=excluded.verify_method,
-                max_wrong_answers=excluded.max_wrong_answers,
-                verify_time=excluded.verify_time,
-                created_at=excluded.created_at;
-            """,
-            (
-                state_key,
-                data.get("status", "pending"),
-                data.get("question"),
-                data.get("answer"),
-                data.get("wrong_count", 0),
-                data.get("verify_method"),
-                data.get("max_wrong_answers", 5),
-                data.get("verify_time"),
-                data.get("created_at"),
-            ),
-        )
-        await self._conn.commit()
+        self._stats["writes"] += 1
+        if self._write_behind:
+            self._deleted.discard(state_key)
+            self._dirty[state_key] = data
+            return
+
+        # 与旧表迁移批次、批量写入使用同一把锁，避免迁移把刚删除或刚写入的记录覆盖
+        async with self._flush_lock:
+            await self._conn.execute(_UPSERT_SQL, self._to_row(state_key, data))
+            await self._conn.commit()
+        self._stats["commits"] += 1
+
+    async def _flush_loop(self):
+        try:
+            while True:
+                await asyncio.sleep(self._flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
 
-    async def get(self, state_key: str) -> Optional[dict]:
-        return self._cache.get(state_key)
+    async def flush(self):
+        """将窗口内累积的脏键合并为一个事务写入数据库"""
+        async with self._flush_lock:
+            if not self._conn or (not self._dirty and not self._deleted):
+                return
+
+            dirty, deleted = self._dirty, self._deleted
+            self._dirty, self._deleted = {}, set()
+
+            rows = [self._to_row(key, record) for key, record in dirty.items()]
+            start = time.perf_counter()
+            try:
+                if rows:
+                    await self._conn.executemany(_UPSERT_SQL, rows)
+                if deleted:
+                    await self._conn.executemany(_DELETE_SQL, [self._split_key(key) for key in deleted])
+                    if self._legacy:
+                        await self._conn.executemany(_LEGACY_DELETE_SQL, [(key,) for key in deleted])
+                await self._conn.commit()
+            except Exception as e:
+                # 提交失败时把未写入的键放回队列，刷新期间产生的新操作优先
+                for key, record in dirty.items():
+                    if key not in self._deleted:
+                        self._dirty.setdefault(key, record)
+                self._deleted.update(key for key in deleted if key not in self._dirty)
+                self._stats["flush_errors"] += 1
+                logger.error(f"[Geetest Verify] 批量写入验证状态失败: {e}")
+                return
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            batch_size = len(rows) + len(deleted)
+            stats = self._stats
+            stats["commits"] += 1
+            stats["flushes"] += 1
+            stats["rows_flushed"] += batch_size
+            stats["last_batch_size"] = batch_size
+            stats["max_batch_size"] = max(stats["max_batch_size"], batch_size)
+            stats["last_flush_ms"] = elapsed_ms
+            stats["max_flush_ms"] = max(stats["max_flush_ms"], elapsed_ms)
+            stats["total_flush_ms"] += elapsed_ms
+            logger.debug(f"[Geetest Verify] 已批量写入 {batch_size} 条验证状态，耗时 {elapsed_ms:.2f} ms")
+
+    def get_stats(self) -> dict:
+        """返回写入统计：逻辑写入次数、实际提交次数、批量大小与刷新耗时"""
+        stats = dict(self._stats)
+        flushes = stats["flushes"]
+        stats["avg_batch_size"] = stats["rows_flushed"] / flushes if flushes else 0.0
+        stats["avg_flush_ms"] = stats["total_flush_ms"] / flushes if flushes else 0.0
+        stats["pending_writes"] = len(self._dirty) + len(self._deleted)
+        stats["write_behind"] = self._write_behind
+        stats["pending_states"] = len(self._cache)
+        stats["cold_cached"] = len(self._cold)
+        stats["pending_groups"] = len(self._pending_by_group)
+        stats["legacy_table"] = self._legacy
+        return stats
+
+    async def get(self, state_key: str) -> Optional[StateRecord]:
+        """读取任意状态：待验证状态直接返回，其余状态先查 LRU，未命中再按主键查询数据库"""
+        record = self.get_cached(state_key)
+        if record is not None or state_key in self._deleted:
+            return record
+        cold = self._cold.get(state_key)
+        if cold is not None:
+            # 命中“不存在”的占位
+            self._stats["cold_hits"] += 1
+            return None
+        if not self._conn:
+            return None
+
+        try:
+            gid, uid = self._split_key(state_key)
+        except ValueError:
+            return None
+
+        self._stats["cold_queries"] += 1
+        async with self._conn.execute(
+            f"SELECT {_FIELD_COLUMNS} FROM member_states WHERE group_id = ? AND user_id = ?;", (gid, uid)
+        ) as cur:
+            row = await cur.fetchone()
+        if row is None and self._legacy:
+            # 尚未迁移的旧记录
+            async with self._conn.execute(
+                f"SELECT {_FIELD_COLUMNS} FROM verify_states WHERE state_key = ?;", (state_key,)
+            ) as cur:
+                row = await cur.fetchone()
+        # 查询期间可能已有新的写入，以内存中的为准
+        record = self.get_cached(state_key)
+        if record is not None or state_key in self._deleted:
+            return record
+        record = StateRecord.from_row(row) if row else None
+        self._place(state_key, record)
+        if record is not None and record.status == "pending":
+            self._reindex(state_key, record)
+        return record
 
     async def set(self, state_key: str, data: dict):
-        if "created_at" not in data:
-            existing = self._cache.get(state_key)
-            if existing and "created_at" in existing:
-                data["created_at"] = existing["created_at"]
-            else:
-                data["created_at"] = time.time()
+        record = StateRecord.from_mapping(data)
+        if record.created_at is None:
+            existing = await self.get(state_key)
+            record.created_at = existing.created_at if existing and existing.created_at is not None else time.time()
+        await self._save_to_db(state_key, record)
 
-        self._cache[state_key] = data
-        await self._save_to_db(state_key, data)
+    async def set_many(self, records: dict):
+        """在一个事务中写入多条状态，records 为 state_key -> 状态；只处理内存中的待验证状态时不查询数据库"""
+        if not records:
+            return
+        if not self._conn:
+            raise RuntimeError("VerifyStateDB not initialized")
+        now = time.time()
+        rows = []
+        for state_key, data in records.items():
+            record = StateRecord.from_mapping(data)
+            if record.created_at is None:
+                existing = self.get_cached(state_key)
+                record.created_at = existing.created_at if existing and existing.created_at is not None else now
+            rows.append(self._to_row(state_key, record))
+            self._place(state_key, record)
+            self._reindex(state_key, record)
+            if self._write_behind:
+                self._deleted.discard(state_key)
+                self._dirty[state_key] = record
+
+        self._stats["writes"] += len(rows)
+        if self._write_behind:
+            return
+        async with self._flush_lock:
+            await self._conn.executemany(_UPSERT_SQL, rows)
+            await self._conn.commit()
+        self._stats["commits"] += 1
 
     async def update_field(self, state_key: str, field: str, value):
-        if state_key not in self._cache:
+        record = await self.get(state_key)
+        if record is None:
+            return
+        record[field] = value
+        await self._save_to_db(state_key, record)
+
+    async def update_fields(self, state_key: str, **fields):
+        """一次更新多个字段，只产生一次写入"""
+        record = await self.get(state_key)
+        if record is None:
+            return
+        record.update(fields)
+        await self._save_to_db(state_key, record)
+
+    async def load_deadlines(self) -> list:
+        """通过 deadline 索引读取所有未到期/已过期的计时，按截止时间排序
+
+        返回 (state_key, gid, uid, deadline, timer_stage, platform) 列表，uid 为字符串。
+        """
+        if not self._conn:
+            return []
+        async with self._conn.execute(
+            "SELECT group_id, user_id, deadline, timer_stage, platform FROM member_states "
+            "WHERE deadline IS NOT NULL ORDER BY deadline;"
+        ) as cur:
+            return [
+                (f"{row['group_id']}:{row['user_id']}", row["group_id"], str(row["user_id"]),
+                 row["deadline"], row["timer_stage"], row["platform"])
+                async for row in cur
+            ]
+
+    async def save_deadlines(self, items: list):
+        """在一个事务中保存 (state_key, deadline, timer_stage) 计时检查点"""
+        rows = []
+        for state_key, deadline, stage in items:
+            data = self._cache.get(state_key)
+            if data is None:
+                continue
+            data["deadline"] = deadline
+            data["timer_stage"] = stage
+            rows.append((deadline, stage, *self._split_key(state_key)))
+        if not rows or not self._conn:
+            return
+        async with self._flush_lock:
+            await self._conn.executemany(_SAVE_DEADLINE_SQL, rows)
+            await self._conn.commit()
+        self._stats["commits"] += 1
+
+    async def enqueue_actions(self, actions: list) -> int:
+        """在一个事务中写入动作发件箱，actions 为
+        (idem_key, platform, gid, uid, action, payload_json, not_before) 列表；返回新写入的条数"""
+        if not actions or not self._conn:
+            return 0
+        now = time.time()
+        async with self._flush_lock:
+            before = self._conn.total_changes
+            await self._conn.executemany(_ENQUEUE_ACTION_SQL, [(*action, now) for action in actions])
+            await self._conn.commit()
+            added = self._conn.total_changes - before
+        self._stats["commits"] += 1
+        return added
+
+    async def fetch_due_actions(self, now: float, limit: int) -> list:
+        """按 not_before 索引读取已到期的动作"""
+        if not self._conn:
+            return []
+        async with self._conn.execute(
+            "SELECT idem_key, platform, gid, uid, action, payload, attempts FROM action_outbox "
+            "WHERE not_before <= ? ORDER BY not_before LIMIT ?;", (now, limit)
+        ) as cur:
+            return [tuple(row) async for row in cur]
+
+    async def next_action_time(self) -> Optional[float]:
+        if not self._conn:
+            return None
+        async with self._conn.execute("SELECT MIN(not_before) FROM action_outbox;") as cur:
+            row = await cur.fetchone()
+        return row[0] if row else None
+
+    async def count_actions(self) -> int:
+        if not self._conn:
+            return 0
+        async with self._conn.execute("SELECT COUNT(*) FROM action_outbox;") as cur:
+            row = await cur.fetchone()
+        return row[0] if row else 0
+
+    async def settle_actions(self, done: list, retry: list):
+        """在一个事务中删除已完成（或放弃）的动作，并为失败的动作设置下次重试时间
+
+        done 为 idem_key 列表，retry 为 (not_before, attempts, last_error, idem_key) 列表。
+        """
+        if not self._conn or (not done and not retry):
             return
-        self._cache[state_key][field] = value
-        await self._save_to_db(state_key, self._cache[state_key])
+        async with self._flush_lock:
+            if done:
+                await self._conn.executemany("DELETE FROM action_outbox WHERE idem_key = ?;", [(key,) for key in done])
+            if retry:
+                await self._conn.executemany(
+                    "UPDATE action_outbox SET not_before = ?, attempts = ?, last_error = ? WHERE idem_key = ?;", retry
+                )
+            await self._conn.commit()
+        self._stats["commits"] += 1
 
     async def delete(self, state_key: str):
-        self._cache.pop(state_key, None)
-        if self._conn:
-            await self._conn.execute("DELETE FROM verify_states WHERE state_key = ?", (state_key,))
+        self._place(state_key, None)
+        self._reindex(state_key, None)
+        if not self._conn:
+            return
+
+        self._stats["writes"] += 1
+        if self._write_behind:
+            self._dirty.pop(state_key, None)
+            self._deleted.add(state_key)
+            return
+
+        async with self._flush_lock:
+            await self._conn.execute(_DELETE_SQL, self._split_key(state_key))
+            if self._legacy:
+                await self._conn.execute(_LEGACY_DELETE_SQL, (state_key,))
             await self._conn.commit()
+        self._stats["commits"] += 1
+
+    async def delete_many(self, state_keys: list):
+        """在一个事务中删除多条状态"""
+        if not state_keys:
+            return
+        for state_key in state_keys:
+            self._place(state_key, None)
+            self._reindex(state_key, None)
+        if not self._conn:
+            return
+
+        self._stats["writes"] += len(state_keys)
+        if self._write_behind:
+            for state_key in state_keys:
+                self._dirty.pop(state_key, None)
+                self._deleted.add(state_key)
+            return
+
+        async with self._flush_lock:
+            await self._conn.executemany(_DELETE_SQL, [self._split_key(key) for key in state_keys])
+            if self._legacy:
+                await self._conn.executemany(_LEGACY_DELETE_SQL, [(key,) for key in state_keys])
+            await self._conn.commit()
+        self._stats["commits"] += 1
 
     def contains(self, state_key: str) -> bool:
-        return state_key in self._cache
+        """是否为内存中的状态（待验证状态或最近用过的其他状态），不查询数据库"""
+        return self.get_cached(state_key) is not None
 
-    def get_cached(self, state_key: str) -> Optional[dict]:
-        return self._cache.get(state_key)
+    def get_cached(self, state_key: str) -> Optional[StateRecord]:
+        """只查内存：待验证状态总能查到，其他状态只有最近用过时才能查到"""
+        record = self._cache.get(state_key)
+        if record is not None:
+            return record
+        record = self._dirty.get(state_key)
+        if record is not None:
+            return record
+        cold = self._cold.get(state_key)
+        if cold is None or cold is _MISSING:
+            return None
+        self._cold.move_to_end(state_key)
+        self._stats["cold_hits"] += 1
+        return cold
 
-    def all_keys(self) -> list:
+    def pending_keys(self) -> list:
+        """所有待验证状态的键"""
         return list(self._cache.keys())
 
-    async def cleanup_expired(self, max_age_seconds: float = 86400):
+    def pending_items(self) -> list:
+        """所有待验证状态的 (state_key, gid, uid, record)，gid 为整数、uid 为字符串"""
+        items = []
+        for gid, keys in self._pending_by_group.items():
+            for state_key in keys:
+                record = self._cache.get(state_key)
+                if record is not None:
+                    items.append((state_key, gid, state_key.partition(":")[2], record))
+        return items
+
+    def pending_groups(self) -> list:
+        """有待验证状态的群号"""
+        return list(self._pending_by_group)
+
+    def group_pending_keys(self, gid: int) -> list:
+        """某个群所有待验证状态的键，O(该群待验证人数)"""
+        return list(self._pending_by_group.get(gid, ()))
+
+    def count_group_pending(self, gid: int) -> int:
+        return len(self._pending_by_group.get(gid, ()))
+
+    async def count_group_states(self, gid: int, status: str) -> int:
+        """统计某个群某一状态的记录数，走 (group_id, status) 索引的范围扫描"""
+        if status == "pending":
+            return self.count_group_pending(gid)
+        if not self._conn:
+            return 0
+        await self.flush()
+        async with self._conn.execute(
+            "SELECT COUNT(*) FROM member_states WHERE group_id = ? AND status = ?;", (gid, status)
+        ) as cur:
+            row = await cur.fetchone()
+        return row[0] if row else 0
+
+    async def list_group_states(self, gid: int, status: Optional[str] = None, limit: int = 100) -> list:
+        """按用户 ID 顺序列出某个群的记录 (uid, record)，可按状态筛选"""
+        if not self._conn:
+            return []
+        await self.flush()
+        if status is None:
+            sql = f"SELECT {_SELECT_COLUMNS} FROM member_states WHERE group_id = ? ORDER BY user_id LIMIT ?;"
+            params = (gid, limit)
+        else:
+            sql = f"SELECT {_SELECT_COLUMNS} FROM member_states WHERE group_id = ? AND status = ? ORDER BY user_id LIMIT ?;"
+            params = (gid, status, limit)
+        async with self._conn.execute(sql, params) as cur:
+            return [(str(row["user_id"]), StateRecord.from_row(row)) async for row in cur]
+
+    def configure_retention(self, retention: dict, sweep_interval: float):
+        """更新各状态的保留时长与清理间隔，下一轮清理生效"""
+        self._retention = dict(retention)
+        self._sweep_interval = max(_MIN_SWEEP_INTERVAL, float(sweep_interval))
+        if self._sweep_wakeup is not None:
+            self._sweep_wakeup.set()
+
+    async def _sweep_loop(self):
+        while True:
+            # 先清除唤醒标记，清理期间收到的唤醒（如修改保留时长）留到下一轮
+            self._sweep_wakeup.clear()
+            try:
+                await self.cleanup_expired()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Geetest Verify] 清理过期验证状态失败: {e}")
+            try:
+                await asyncio.wait_for(self._sweep_wakeup.wait(), self._sweep_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def cleanup_expired(self) -> int:
+        """按状态删除超过保留时长的记录（每个状态一条走 (status, created_at) 索引的 DELETE），并增量回收空间"""
+        if not self._conn:
+            return 0
         now = time.time()
-        expired_keys = []
-        for key, data in self._cache.items():
-            if data.get("status") in ("verified", "bypassed"):
-                created_at = data.get("created_at") or data.get("verify_time") or 0
-                if now - created_at > max_age_seconds:
-                    expired_keys.append(key)
+        rules = [(status, now - seconds) for status, seconds in self._retention.items() if seconds and seconds > 0]
+        if not rules:
+            return 0
 
-        for key in expired_keys:
-            await self.delete(key)
+        # 先写入积压的修改，避免之后把已删除的行写回
+        await self.flush()
+        removed = 0
+        async with self._flush_lock:
+            for status, cutoff in rules:
+                cur = await self._conn.execute(
+                    "DELETE FROM member_states WHERE status = ? AND created_at < ?;", (status, cutoff)
+                )
+                removed += max(cur.rowcount, 0)
+                # 极旧版本遗留的没有创建时间的记录
+                cur = await self._conn.execute(
+                    "DELETE FROM member_states WHERE status = ? AND created_at IS NULL AND COALESCE(verify_time, 0) < ?;",
+                    (status, cutoff),
+                )
+                removed += max(cur.rowcount, 0)
+            await self._conn.commit()
+            self._stats["commits"] += 1
+
+            async with self._conn.execute("PRAGMA freelist_count;") as cur:
+                row = await cur.fetchone()
+            free_pages = row[0] if row else 0
+            if free_pages:
+                async with self._conn.execute(f"PRAGMA incremental_vacuum({_VACUUM_PAGES});") as cur:
+                    await cur.fetchall()
+                await self._conn.commit()
+                self._stats["vacuumed_pages"] += min(free_pages, _VACUUM_PAGES)
 
-        if expired_keys:
-            logger.info(f"[Geetest Verify] 清理过期验证状态 {len(expired_keys)} 个")
+        self._stats["sweeps"] += 1
+        self._stats["swept_rows"] += removed
+        if removed:
+            # 被删除的记录可能还在 LRU 中
+            self._cold.clear()
+            logger.info(f"[Geetest Verify] 清理过期验证状态 {removed} 个")
+        return removed
 
     async def close(self):
+        if self._migrate_task and not self._migrate_task.done():
+            self._migrate_task.cancel()
+            try:
+                await self._migrate_task
+            except asyncio.CancelledError:
+                pass
+        self._migrate_task = None
+
+        if self._sweep_task and not self._sweep_task.done():
+            self._sweep_task.cancel()
+            try:
+                await self._sweep_task
+            except asyncio.CancelledError:
+                pass
+        self._sweep_task = None
+
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+
+        await self.flush()
+
+        if self._write_behind:
+            stats = self.get_stats()
+            logger.info(
+                f"[Geetest Verify] 验证状态写入统计：逻辑写入 {stats['writes']} 次，实际提交 {stats['commits']} 次，"
+                f"平均批量 {stats['avg_batch_size']:.1f} 条，平均耗时 {stats['avg_flush_ms']:.2f} ms"
+            )
+
         if self._conn:
             await self._conn.close()
             self._conn = None
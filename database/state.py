@@ -0,0 +1,95 @@
+import sys
+from typing import Any, Iterator, Optional
+
+# 状态、验证方式等取值种类很少，统一驻留，所有记录共享同一个字符串对象
+_INTERNED_FIELDS = frozenset(("status", "verify_method", "platform", "timer_stage"))
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class StateRecord:
+    """一条验证状态记录
+
+    用 __slots__ 保存固定字段，内存占用远小于等价的 dict；
+    对外提供 get / [] / in / update 等与 dict 相同的用法，值为 None 的字段视为不存在。
+    """
+
+    FIELDS = (
+        "status",
+        "question",
+        "answer",
+        "wrong_count",
+        "verify_method",
+        "max_wrong_answers",
+        "verify_time",
+        "created_at",
+        "platform",
+        "deadline",
+        "timer_stage",
+    )
+
+    __slots__ = FIELDS
+
+    def __init__(self, status: str = "pending", question: Optional[str] = None, answer: Optional[int] = None,
+                 wrong_count: Optional[int] = None, verify_method: Optional[str] = None,
+                 max_wrong_answers: Optional[int] = None, verify_time: Optional[float] = None,
+                 created_at: Optional[float] = None, platform: Optional[str] = None,
+                 deadline: Optional[float] = None, timer_stage: Optional[str] = None):
+        self.status = _intern(status)
+        self.question = question
+        self.answer = answer
+        self.wrong_count = wrong_count
+        self.verify_method = _intern(verify_method)
+        self.max_wrong_answers = max_wrong_answers
+        self.verify_time = verify_time
+        self.created_at = created_at
+        self.platform = _intern(platform)
+        self.deadline = deadline
+        self.timer_stage = _intern(timer_stage)
+
+    @classmethod
+    def from_mapping(cls, data) -> "StateRecord":
+        if isinstance(data, cls):
+            return data
+        unknown = set(data) - set(cls.FIELDS)
+        if unknown:
+            raise KeyError(f"Unknown state fields: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+    @classmethod
+    def from_row(cls, row) -> "StateRecord":
+        return cls(*(row[field] for field in cls.FIELDS))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, _intern(value) if key in _INTERNED_FIELDS else value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS and getattr(self, key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (field for field in self.FIELDS if getattr(self, field) is not None)
+
+    def update(self, fields=None, **kwargs):
+        for key, value in (fields or {}).items():
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self}
+
+    def __repr__(self) -> str:
+        return f"StateRecord({self.to_dict()!r})"
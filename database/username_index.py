@@ -0,0 +1,154 @@
+import asyncio
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import aiosqlite
+
+from astrbot.api import logger
+
+
+_UPSERT_SQL = """
+    INSERT INTO usernames(username, user_id, seen_at) VALUES (?, ?, ?)
+    ON CONFLICT(username) DO UPDATE SET user_id=excluded.user_id, seen_at=excluded.seen_at;
+"""
+
+_DELETE_SQL = "DELETE FROM usernames WHERE username = ?"
+
+# 同一用户名映射未变时，最多每隔多久刷新一次最近出现时间（秒），避免每条消息都写库
+_TOUCH_INTERVAL = 3600
+
+
+class UsernameIndex:
+    """Telegram 用户名到用户 ID 的索引
+
+    由收到的事件顺带填充（发送者、新成员、被回复者），内存中按 LRU 限制条目数，
+    变更定期批量写入 SQLite，重启后按最近出现时间恢复。
+    """
+
+    def __init__(self, db_path: Path, maxsize: int = 50000, flush_interval: float = 5.0):
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self._flush_interval = flush_interval
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._dirty: set = set()
+        self._deleted: set = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stats = {"observed": 0, "updated": 0, "hits": 0, "misses": 0, "evictions": 0}
+
+    async def init(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = await aiosqlite.connect(str(self.db_path))
+        await self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS usernames (
+                username TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                seen_at REAL NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        await self._conn.commit()
+
+        async with self._conn.execute(
+            "SELECT username, user_id, seen_at FROM usernames ORDER BY seen_at DESC LIMIT ?;", (self.maxsize,)
+        ) as cur:
+            rows = await cur.fetchall()
+        for username, user_id, seen_at in reversed(rows):
+            self._entries[username] = (user_id, seen_at)
+
+        # 删除超出容量的旧记录
+        if len(rows) >= self.maxsize:
+            await self._conn.execute("DELETE FROM usernames WHERE seen_at < ?;", (rows[-1][2],))
+            await self._conn.commit()
+
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"[Geetest Verify] 已加载 {len(self._entries)} 条 Telegram 用户名索引")
+
+    def observe(self, username: str, user_id) -> None:
+        """记录一次用户名与用户 ID 的对应关系，O(1)"""
+        if not username or user_id is None:
+            return
+        username = username.lower()
+        user_id = str(user_id)
+        now = time.time()
+        self._stats["observed"] += 1
+
+        entry = self._entries.get(username)
+        if entry is not None:
+            self._entries.move_to_end(username)
+            if entry[0] == user_id and now - entry[1] < _TOUCH_INTERVAL:
+                return
+        self._entries[username] = (user_id, now)
+        self._dirty.add(username)
+        self._deleted.discard(username)
+        self._stats["updated"] += 1
+
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            self._dirty.discard(evicted)
+            self._deleted.add(evicted)
+            self._stats["evictions"] += 1
+
+    def lookup(self, username: str) -> Optional[str]:
+        """按用户名（不区分大小写，可带 @）查找用户 ID，O(1)，不发起网络请求"""
+        entry = self._entries.get(username.lstrip("@").lower())
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return entry[0]
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["size"] = len(self._entries)
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[Geetest Verify] 写入用户名索引失败: {e}")
+
+    async def flush(self):
+        if not self._conn or (not self._dirty and not self._deleted):
+            return
+        async with self._flush_lock:
+            dirty, self._dirty = self._dirty, set()
+            deleted, self._deleted = self._deleted, set()
+            rows = []
+            for username in dirty:
+                entry = self._entries.get(username)
+                if entry is not None:
+                    rows.append((username, entry[0], entry[1]))
+            try:
+                if rows:
+                    await self._conn.executemany(_UPSERT_SQL, rows)
+                if deleted:
+                    await self._conn.executemany(_DELETE_SQL, [(username,) for username in deleted])
+                await self._conn.commit()
+            except Exception:
+                self._dirty |= dirty
+                self._deleted |= deleted
+                raise
+
+    async def close(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self._conn:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[Geetest Verify] 写入用户名索引失败: {e}")
+            await self._conn.close()
+            self._conn = None
@@ -1,104 +1,231 @@
 from __future__ import annotations
 
 import asyncio
-import copy
 import time
+from collections.abc import Mapping
+from types import MappingProxyType
 from typing import Any
 
 from astrbot.api import logger
 from astrbot.api.star import Context
 
+# 单个客户端调用的超时（秒），慢的 bot 不会拖慢其他 bot 的结果
+_CLIENT_TIMEOUT = 5.0
+# 单个群详情的有效期，以及查不到的群（如 bot 已退出）的负缓存有效期（秒）
+_DETAIL_TTL = 300.0
+_NEGATIVE_TTL = 600.0
+
+
+class GroupSnapshot:
+    """某一时刻的群列表快照，创建后不再修改，可以直接共享给多个读者"""
+
+    __slots__ = ("groups", "by_id", "refreshed_at")
+
+    def __init__(self, groups: tuple[Mapping[str, Any], ...], refreshed_at: float):
+        self.groups = groups
+        self.by_id: Mapping[str, Mapping[str, Any]] = MappingProxyType(
+            {group["group_id"]: group for group in groups}
+        )
+        self.refreshed_at = refreshed_at
+
+
+_EMPTY_SNAPSHOT = GroupSnapshot((), 0.0)
+
 
 class GroupInfoCache:
-    """从 QQ API 获取群名称和头像的缓存"""
+    """从 QQ API 获取群名称和头像的缓存
+
+    群列表以不可变快照保存，读取时直接返回快照中的只读对象，不做拷贝。
+    快照过期后先返回旧快照，同时在后台刷新（stale-while-revalidate），
+    只有首次加载或强制刷新时才会等待。
+    不在群列表中的群按单个群查询，结果按条目缓存；查不到的群记入负缓存，
+    有效期内直接返回占位信息，不再请求。
+    """
 
     def __init__(self, context: Context, ttl_seconds: int = 120):
         self.context = context
         self.ttl_seconds = ttl_seconds
 
-        self._lock = asyncio.Lock()
-        self._last_refresh_at = 0.0
-        self._group_list_cache: list[dict[str, Any]] = []
-        self._group_detail_cache: dict[str, dict[str, Any]] = {}
+        self._snapshot = _EMPTY_SNAPSHOT
+        self._refresh_task: asyncio.Task | None = None
+        # aiocqhttp 客户端列表（每次刷新群列表时重新扫描）和 group_id -> 所在 bot 客户端的路由表
+        self._clients: list[Any] | None = None
+        self._routes: dict[str, Any] = {}
+        # group_id -> (群信息, 过期时间)
+        self._group_detail_cache: dict[str, tuple[Mapping[str, Any], float]] = {}
+        # group_id -> (占位信息, 过期时间)
+        self._missing_groups: dict[str, tuple[Mapping[str, Any], float]] = {}
+        self._stats = {
+            "list_refreshes": 0,
+            "detail_lookups": 0,
+            "remote_calls": 0,
+            "snapshot_hits": 0,
+            "detail_hits": 0,
+            "negative_hits": 0,
+        }
+
+    async def get_snapshot(self, force: bool = False) -> GroupSnapshot:
+        snapshot = self._snapshot
+        if force or not snapshot.refreshed_at:
+            await self._refresh_group_list()
+            return self._snapshot
+        if not self._is_fresh(snapshot):
+            self._schedule_refresh()
+        return snapshot
 
-    async def list_groups(self, force: bool = False) -> list[dict[str, Any]]:
-        if force or not self._is_fresh() or not self._group_list_cache:
-            await self._refresh_group_list(force=force)
-        return copy.deepcopy(self._group_list_cache)
+    async def list_groups(self, force: bool = False) -> tuple[Mapping[str, Any], ...]:
+        return (await self.get_snapshot(force=force)).groups
 
-    async def get_group(self, group_id: str, force: bool = False) -> dict[str, Any]:
+    async def get_group(self, group_id: str, force: bool = False) -> Mapping[str, Any]:
         normalized = str(group_id).strip()
         if not normalized:
             raise ValueError("group_id must not be empty")
 
-        if (
-            force
-            or not self._is_fresh()
-            or normalized not in self._group_detail_cache
-        ):
-            await self._refresh_group_list(force=force)
+        if force:
+            return await self.refresh_group(normalized)
 
+        snapshot = await self.get_snapshot()
+        now = time.time()
         cached = self._group_detail_cache.get(normalized)
-        if cached and not force and self._is_fresh():
-            return copy.deepcopy(cached)
+        if cached and cached[1] > now:
+            self._stats["detail_hits"] += 1
+            return cached[0]
+        group = snapshot.by_id.get(normalized)
+        if group is not None:
+            self._stats["snapshot_hits"] += 1
+            return group
+        missing = self._missing_groups.get(normalized)
+        if missing and missing[1] > now:
+            self._stats["negative_hits"] += 1
+            return missing[0]
+
+        return await self._load_group_detail(normalized)
 
-        detail = await self._load_group_detail(normalized)
-        self._group_detail_cache[normalized] = detail
-        return copy.deepcopy(detail)
+    async def refresh_group(self, group_id: str) -> Mapping[str, Any]:
+        """只刷新单个群的信息，不影响群列表快照"""
+        normalized = str(group_id).strip()
+        if not normalized:
+            raise ValueError("group_id must not be empty")
+        self._missing_groups.pop(normalized, None)
+        return await self._load_group_detail(normalized)
 
     def invalidate(self, group_id: str | None = None) -> None:
         if group_id:
-            self._group_detail_cache.pop(str(group_id).strip(), None)
+            normalized = str(group_id).strip()
+            self._group_detail_cache.pop(normalized, None)
+            self._missing_groups.pop(normalized, None)
             return
         self._group_detail_cache.clear()
-        self._last_refresh_at = 0.0
-
-    def _is_fresh(self) -> bool:
-        return (time.time() - self._last_refresh_at) < self.ttl_seconds
-
-    async def _refresh_group_list(self, force: bool = False) -> None:
-        async with self._lock:
-            if not force and self._is_fresh() and self._group_list_cache:
-                return
-
-            merged: dict[str, dict[str, Any]] = {}
-
-            for client in self._iter_clients():
-                try:
-                    result = await client.call_action("get_group_list")
-                    for item in self._extract_list(result):
-                        group_id = str(item.get("group_id", "")).strip()
-                        if not group_id or group_id in merged:
-                            continue
-                        merged[group_id] = self._normalize_group(item)
-                except Exception as exc:
-                    logger.warning("获取群列表失败: %s", exc)
-
-            self._group_list_cache = list(merged.values())
-            self._group_detail_cache = merged
-            self._last_refresh_at = time.time()
-
-    async def _load_group_detail(self, group_id: str) -> dict[str, Any]:
-        cached = self._group_detail_cache.get(group_id)
-        if cached:
-            return copy.deepcopy(cached)
-
-        for client in self._iter_clients():
-            try:
-                result = await client.call_action(
-                    "get_group_info", group_id=int(group_id)
-                )
-                info = self._extract_object(result)
-                if info:
-                    detail = self._normalize_group(info)
-                    self._group_detail_cache[group_id] = detail
-                    return copy.deepcopy(detail)
-            except Exception as exc:
-                logger.debug("获取群详情失败 %s: %s", group_id, exc)
-
-        return self._build_fallback_group(group_id)
-
-    def _iter_clients(self) -> list[Any]:
+        self._missing_groups.clear()
+        # 快照不可变，标记为过期，下次读取时在后台刷新
+        snapshot = self._snapshot
+        if snapshot.refreshed_at:
+            self._snapshot = GroupSnapshot(snapshot.groups, -1.0)
+
+    def get_client_for_group(self, group_id: Any) -> Any | None:
+        """返回所在群的 bot 客户端，未知时返回 None"""
+        return self._routes.get(str(group_id))
+
+    def route_group(self, group_id: Any, client: Any) -> None:
+        """记录从事件中观察到的群与 bot 客户端的对应关系"""
+        if client is not None:
+            self._routes[str(group_id)] = client
+
+    def get_stats(self) -> dict[str, Any]:
+        stats = dict(self._stats)
+        stats["groups"] = len(self._snapshot.groups)
+        stats["details"] = len(self._group_detail_cache)
+        stats["missing"] = len(self._missing_groups)
+        stats["routes"] = len(self._routes)
+        return stats
+
+    def _is_fresh(self, snapshot: GroupSnapshot) -> bool:
+        return (time.time() - snapshot.refreshed_at) < self.ttl_seconds
+
+    def _schedule_refresh(self) -> None:
+        # 直接启动刷新任务本身，等待者（_refresh_group_list）共享同一个任务
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._do_refresh())
+
+    async def _refresh_group_list(self) -> None:
+        # 同一时间只进行一次刷新，其余调用等待同一个刷新结果
+        task = self._refresh_task
+        if task is None or task.done():
+            task = self._refresh_task = asyncio.create_task(self._do_refresh())
+        await asyncio.shield(task)
+
+    async def _do_refresh(self) -> None:
+        clients = self._iter_clients(rescan=True)
+        self._stats["list_refreshes"] += 1
+        self._stats["remote_calls"] += len(clients)
+        results = await asyncio.gather(
+            *(self._call_client(client, "get_group_list") for client in clients),
+            return_exceptions=True,
+        )
+
+        merged: dict[str, Mapping[str, Any]] = {}
+        listed: dict[str, Any] = {}
+        answered: list[Any] = []
+        for client, result in zip(clients, results):
+            if isinstance(result, BaseException):
+                logger.warning("获取群列表失败: %s", result)
+                continue
+            answered.append(client)
+            for item in self._extract_list(result):
+                group_id = str(item.get("group_id", "")).strip()
+                if not group_id:
+                    continue
+                listed.setdefault(group_id, client)
+                if group_id not in merged:
+                    merged[group_id] = self._normalize_group(item)
+
+        self._snapshot = GroupSnapshot(tuple(merged.values()), time.time())
+        # 合并到现有路由表：只删除归属 bot 已答复但没有列出的群（如已退群），
+        # 未答复的 bot 的路由和从事件中学到的路由保留
+        routes = self._routes
+        for group_id, routed in list(routes.items()):
+            if group_id not in listed and any(routed is client for client in answered):
+                del routes[group_id]
+        routes.update(listed)
+        # 群列表中的信息更新，单独缓存的条目和负缓存不再需要
+        for group_id in merged:
+            self._group_detail_cache.pop(group_id, None)
+            self._missing_groups.pop(group_id, None)
+
+    async def _load_group_detail(self, group_id: str) -> Mapping[str, Any]:
+        routed = self._routes.get(group_id)
+        clients = [routed] if routed is not None else self._iter_clients()
+        self._stats["detail_lookups"] += 1
+        self._stats["remote_calls"] += len(clients)
+        results = await asyncio.gather(
+            *(self._call_client(client, "get_group_info", group_id=int(group_id)) for client in clients),
+            return_exceptions=True,
+        )
+
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.debug("获取群详情失败 %s: %s", group_id, result)
+                continue
+            info = self._extract_object(result)
+            if info:
+                detail = self._normalize_group(info)
+                self._group_detail_cache[group_id] = (detail, time.time() + _DETAIL_TTL)
+                return detail
+
+        fallback = self._build_fallback_group(group_id)
+        # 只有客户端明确答复（而不是全部超时或出错）时才记入负缓存
+        if any(not isinstance(result, BaseException) for result in results):
+            self._missing_groups[group_id] = (fallback, time.time() + _NEGATIVE_TTL)
+        return fallback
+
+    @staticmethod
+    async def _call_client(client: Any, action: str, **params: Any) -> Any:
+        return await asyncio.wait_for(client.call_action(action, **params), _CLIENT_TIMEOUT)
+
+    def _iter_clients(self, rescan: bool = False) -> list[Any]:
+        if self._clients and not rescan:
+            return self._clients
+
         clients: list[Any] = []
         try:
             from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_platform_adapter import (
@@ -116,29 +243,30 @@ class GroupInfoCache:
                 continue
             if client is not None:
                 clients.append(client)
+        self._clients = clients
         return clients
 
     @classmethod
-    def _normalize_group(cls, raw: dict[str, Any]) -> dict[str, Any]:
+    def _normalize_group(cls, raw: dict[str, Any]) -> Mapping[str, Any]:
         group_id = str(raw.get("group_id", "")).strip()
-        return {
+        return MappingProxyType({
             "group_id": group_id,
             "group_name": str(raw.get("group_name", "")).strip()
             or f"群 {group_id}",
             "avatar": cls._build_avatar(group_id),
             "member_count": cls._safe_int(raw.get("member_count"), 0),
             "max_member_count": cls._safe_int(raw.get("max_member_count"), 0),
-        }
+        })
 
     @classmethod
-    def _build_fallback_group(cls, group_id: str) -> dict[str, Any]:
-        return {
+    def _build_fallback_group(cls, group_id: str) -> Mapping[str, Any]:
+        return MappingProxyType({
             "group_id": group_id,
             "group_name": f"群 {group_id}",
             "avatar": cls._build_avatar(group_id),
             "member_count": 0,
             "max_member_count": 0,
-        }
+        })
 
     @staticmethod
     def _build_avatar(group_id: str) -> str:
@@ -1,18 +1,22 @@
 import asyncio
 import re
+import time
 from pathlib import Path
-from typing import Dict
-
-import aiohttp
 
 from astrbot.api import logger
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, StarTools, register
 
 from .database.db import VerifyStateDB
+from .database.username_index import UsernameIndex
 from .config.config import ConfigMixin
 from .platform.platform import PlatformMixin
 from .core.verifier import VerifyMixin
+from .core.scheduler import DeadlineScheduler
+from .core.outbound import OutboundQueue
+from .core.outbox import ActionOutbox
+from .core.persistence import DebouncedWriter
+from .group_info_cache import GroupInfoCache
 from .web import WebController
 
 
@@ -27,32 +31,73 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
         super().__init__(context)
         self.context = context
         self.config = config or {}
+        # 插件配置和 _internal_state.json 的保存都经由同一个写入器合并、异步落盘
+        self._persistence = DebouncedWriter()
+
+        self._load_config()
 
         self._data_dir = StarTools.get_data_dir("astrbot_plugin_group_geetest_verify")
         db_path = self._data_dir / "verify_states.db"
-        self.db = VerifyStateDB(db_path)
-        self._tasks: Dict[str, asyncio.Task] = {}
-
-        self.session = aiohttp.ClientSession()
-
-        self._load_config()
+        self.db = VerifyStateDB(
+            db_path,
+            write_behind=bool(self.db_write_behind),
+            flush_interval=self.db_flush_interval_ms / 1000,
+            retention=self._build_state_retention(),
+            sweep_interval=self.state_sweep_interval_minutes * 60,
+        )
+        self._usernames = UsernameIndex(self._data_dir / "usernames.db")
+        # 群信息缓存同时维护群 -> bot 客户端路由表，多 bot 时定时任务中的发送和踢人直接发给所在 bot
+        self._group_cache = GroupInfoCache(context)
+        self._outbox = ActionOutbox(self.db, self._execute_outbox_action)
+        self._scheduler = DeadlineScheduler(self._on_verification_deadline)
+        self._outbound = OutboundQueue(
+            self._deliver_group_message,
+            rate_per_minute=self.outbound_rate_per_minute,
+            burst=self.outbound_burst,
+            capacity=self.outbound_queue_size,
+        )
+
+        self._init_geetest_client()
+        self._init_level_cache()
+        self._init_admin_roster()
+
+        # 入群处理：并发上限和耗时统计
+        self._join_semaphore = asyncio.Semaphore(max(1, int(self.join_concurrency)))
+        self._join_stats = {"prompted": 0, "last_first_latency": 0.0, "last_nth_latency": 0.0, "max_nth_latency": 0.0}
+        self._background_tasks: set = set()
 
         # 初始化 Web 管理页面
         plugin_dir = Path(context.plugin_dir) if hasattr(context, "plugin_dir") else Path(__file__).parent
-        self.web = WebController(context, config, plugin_dir, on_config_saved=self._load_config)
+        self.web = WebController(context, config, plugin_dir, on_config_saved=self._load_config,
+                                 group_cache=self._group_cache, persistence=self._persistence,
+                                 on_group_patched=self._apply_group_config_patch,
+                                 on_pending_action=self._bulk_group_pending,
+                                 pending_lister=self._list_group_pending)
         self.web.register_routes()
 
     async def initialize(self):
         """实现异步的插件初始化方法，当加载并实例化该插件类之后会自动调用该方法。"""
         logger.info("[Geetest Verify] 插件初始化中...")
 
-        if not hasattr(self, 'session') or self.session.closed:
-            self.session = aiohttp.ClientSession()
+        if self.session is None or self.session.closed:
+            self.session = self._create_geetest_session()
             logger.info("[Geetest Verify] 已创建 aiohttp ClientSession 用于请求验证服务器")
+        await self._warmup_geetest_session()
 
         await self.db.init()
-        await self.db.cleanup_expired(max_age_seconds=86400)
+        await self._usernames.init()
         await self._sync_config_to_db()
+        await self._restore_verification_timers()
+        self._scheduler.start()
+        self._outbox.start()
+
+        # 后台加载群列表以建立群 -> bot 路由表
+        task = asyncio.create_task(self._warmup_group_routes())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        pending_actions = await self.db.count_actions()
+        if pending_actions:
+            logger.info(f"[Geetest Verify] 动作发件箱中有 {pending_actions} 个未完成的动作，将继续执行")
 
         logger.info("[Geetest Verify] 插件初始化完成")
         logger.info("[Geetest Verify] 全局配置：")
@@ -62,21 +107,66 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
         logger.info(f"[Geetest Verify] - 极验验证: {'已启用' if self.enable_geetest_verify else '未启用'}")
         logger.info(f"[Geetest Verify] - 等级验证: {'已启用' if self.enable_level_verify else '未启用'}")
         logger.info(f"[Geetest Verify] - 已配置群数量: {len(self.group_configs)}")
+        logger.info(f"[Geetest Verify] - 验证状态延迟写入: {'已启用' if self.db_write_behind else '未启用'}")
+        logger.info(f"[Geetest Verify] - 每群发送速率: {self.outbound_rate_per_minute} 条/分钟，突发 {self.outbound_burst} 条")
+
+    async def _warmup_group_routes(self):
+        try:
+            groups = await self._group_cache.list_groups()
+            logger.info(f"[Geetest Verify] 已加载 {len(groups)} 个 QQ 群的 bot 路由")
+        except Exception as e:
+            logger.warning(f"[Geetest Verify] 加载群列表失败: {e}")
 
     async def terminate(self):
         """可选择实现异步的插件销毁方法，当插件被卸载/停用时会调用。"""
         logger.info("[Geetest Verify] 插件正在卸载...")
 
-        cancelled_count = 0
-        for task in self._tasks.values():
-            if task and not task.done():
-                task.cancel()
-                cancelled_count += 1
-
-        if cancelled_count > 0:
-            logger.info(f"[Geetest Verify] 已取消 {cancelled_count} 个正在进行的验证任务")
-
-        self._tasks.clear()
+        for task in list(self._background_tasks):
+            task.cancel()
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks.clear()
+
+        await self._scheduler.stop()
+        await self._outbox.stop()
+        outbox_stats = self._outbox.get_stats()
+        logger.info(
+            f"[Geetest Verify] 动作发件箱统计：入队 {outbox_stats['enqueued']} 个，执行成功 {outbox_stats['executed']} 个，"
+            f"失败 {outbox_stats['failed']} 次，放弃 {outbox_stats['dropped']} 个，熔断推迟 {outbox_stats['breaker_skipped']} 次"
+        )
+        await self._outbound.close()
+        stats = self._outbound.get_stats()
+        logger.info(
+            f"[Geetest Verify] 出站消息统计：入队 {stats['enqueued']} 条，发送 {stats['sent']} 条（合并 {stats['merged']} 条），"
+            f"失败 {stats['failed']} 条，最大队列深度 {stats['max_depth']}，平均排队发送耗时 {stats['avg_latency_ms']:.1f} ms"
+        )
+
+        pending_count = await self._checkpoint_verification_timers()
+        if pending_count > 0:
+            logger.info(f"[Geetest Verify] 已保存 {pending_count} 个正在进行的验证计时，重启后将继续")
+
+        await self._persistence.close()
+        persist_stats = self._persistence.get_stats()
+        if persist_stats["requested"]:
+            logger.info(
+                f"[Geetest Verify] 配置保存统计：请求 {persist_stats['requested']} 次，合并 {persist_stats['coalesced']} 次，"
+                f"写入 {persist_stats['writes']} 次，失败 {persist_stats['failed']} 次，"
+                f"平均写入耗时 {persist_stats['avg_write_ms']:.1f} ms，最长延迟 {persist_stats['max_delay_ms']:.0f} ms"
+            )
+
+        level_stats = self.get_level_cache_stats()
+        if level_stats["hits"] or level_stats["misses"]:
+            logger.info(
+                f"[Geetest Verify] QQ等级缓存统计：命中 {level_stats['hits']} 次，未命中 {level_stats['misses']} 次，"
+                f"合并查询 {level_stats['shared_lookups']} 次，当前缓存 {level_stats['size']} 条"
+            )
+
+        username_stats = self._usernames.get_stats()
+        logger.info(
+            f"[Geetest Verify] 用户名索引统计：{username_stats['size']} 条，查找命中 {username_stats['hits']} 次，"
+            f"未命中 {username_stats['misses']} 次，淘汰 {username_stats['evictions']} 条"
+        )
+        await self._usernames.close()
 
         await self.db.close()
 
@@ -86,9 +176,14 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
 
     async def cleanup(self):
         """清理资源，关闭 aiohttp session"""
-        if hasattr(self, 'session') and not self.session.closed:
+        if self.session is not None and not self.session.closed:
             await self.session.close()
             logger.info("[Geetest Verify] 已关闭 aiohttp ClientSession")
+            stats = self.get_geetest_stats()
+            logger.info(
+                f"[Geetest Verify] 验证服务器请求统计：请求 {stats['requests']} 次，重试 {stats['retries']} 次，"
+                f"失败 {stats['errors']} 次，熔断拒绝 {stats['breaker_rejected']} 次，平均延迟 {stats['avg_latency_ms']:.1f} ms"
+            )
 
     @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
     async def handle_event(self, event: AstrMessageEvent):
@@ -99,8 +194,26 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
 
         raw = event.message_obj.raw_message
 
+        if platform == "telegram":
+            self._observe_telegram_users(raw)
+
+        # 快速路径：绝大多数群消息来自无需验证的用户，直接返回，不做日志和字符串格式化
+        msg_gid = self._peek_message_group_id(platform, raw)
+        if msg_gid is not None:
+            # 普通群消息也用于学习群 -> bot 路由（一次字典赋值）
+            if platform == "aiocqhttp":
+                self._group_cache.route_group(msg_gid, getattr(event, "bot", None))
+            if not self.db.is_pending(platform, int(msg_gid), str(event.get_sender_id())):
+                return
+
         logger.debug(f"[Geetest Verify] 收到消息 - message_str: {event.message_str}, 原始类型: {type(raw)}")
 
+        if platform == "telegram":
+            chat_member_update = self._get_raw_value(raw, "chat_member")
+            if chat_member_update:
+                self._process_chat_member_update(chat_member_update)
+                return
+
         if platform == "telegram":
             message_obj = self._get_raw_value(raw, "message") or {}
             logger.info(f"[Geetest Verify] Telegram 消息 - text: {self._get_raw_value(message_obj, 'text')}, caption: {self._get_raw_value(message_obj, 'caption')}")
@@ -110,6 +223,9 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
             logger.warning("[Geetest Verify] 无法获取群组 ID，跳过事件处理")
             return
 
+        if platform == "aiocqhttp":
+            self._group_cache.route_group(gid, getattr(event, "bot", None))
+
         if platform == "telegram":
             logger.info(f"[Geetest Verify] Telegram 群事件 - new_chat_member: {bool(self._get_raw_value(raw, 'new_chat_member'))}, left_chat_member: {bool(self._get_raw_value(raw, 'left_chat_member'))}, text: {self._get_raw_value(raw, 'text')}, message_id: {self._get_raw_value(raw, 'message_id')}")
 
@@ -134,8 +250,36 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
                     await self._process_new_member(event)
                 elif self._get_raw_value(raw, "notice_type") == "group_decrease":
                     await self._process_member_decrease(event)
+                elif self._get_raw_value(raw, "notice_type") == "group_admin":
+                    is_admin = self._get_raw_value(raw, "sub_type") == "set"
+                    self._apply_admin_change(platform, gid, self._get_raw_value(raw, "user_id"), is_admin)
             elif post_type == "message" and self._get_raw_value(raw, "message_type") == "group":
                 await self._process_verification_message(event)
+            elif post_type == "request" and self._get_raw_value(raw, "request_type") == "group":
+                self._process_join_request(gid, raw)
+
+    def _process_chat_member_update(self, update):
+        """处理 Telegram 成员身份变更（chat_member 更新），同步管理员名单缓存"""
+        chat = self._get_raw_value(update, "chat") or {}
+        new_member = self._get_raw_value(update, "new_chat_member") or {}
+        user = self._get_raw_value(new_member, "user") or {}
+        gid = self._get_raw_value(chat, "id")
+        uid = self._get_raw_value(user, "id")
+        if gid is None or uid is None:
+            return
+        is_admin = self._get_raw_value(new_member, "status") in ("administrator", "creator")
+        self._apply_admin_change("telegram", int(gid), uid, is_admin)
+
+    def _process_join_request(self, gid: int, raw):
+        """收到入群申请时预先查询申请人的 QQ 等级，入群后即可直接命中缓存"""
+        if not self.level_prefetch or self._get_raw_value(raw, "sub_type") != "add":
+            return
+        group_config = self._get_group_config(gid)
+        if not group_config["enabled"] or not group_config["enable_level_verify"]:
+            return
+        user_id = self._get_raw_value(raw, "user_id")
+        if user_id:
+            self._prefetch_user_levels([user_id])
 
     async def _process_new_member(self, event: AstrMessageEvent):
         """处理新成员入群"""
@@ -166,37 +310,73 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
             logger.warning("[Geetest Verify] 无法获取新成员信息")
             return
 
-        logger.info(f"[Geetest Verify] 检测到 {len(users)} 个新成员入群")
-
-        for user in users:
-            if platform == "telegram":
-                uid = str(self._get_raw_value(user, "id"))
-            else:
-                uid = str(user.get("id"))
+        group_config = self._get_group_config(gid)
+        if not group_config["enabled"]:
+            return
 
-            state_key = f"{gid}:{uid}"
+        logger.info(f"[Geetest Verify] 检测到 {len(users)} 个新成员入群")
 
-            group_config = self._get_group_config(gid)
-            if not group_config["enabled"]:
-                return
+        if platform == "telegram":
+            uids = [str(self._get_raw_value(user, "id")) for user in users]
+        else:
+            uids = [str(user.get("id")) for user in users]
+
+        # 入群后会先等待 2 秒再检查等级，在此期间提前并发查询
+        if platform == "aiocqhttp" and group_config["enable_level_verify"] and self.level_prefetch:
+            self._prefetch_user_levels(uids)
+
+        # 入群处理在后台并行进行，不阻塞事件
+        task = asyncio.create_task(self._run_join_pipeline(event, platform, gid, uids))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _run_join_pipeline(self, event: AstrMessageEvent, platform: str, gid: int, uids: list):
+        """并行处理同一事件中的多个新成员，并记录从入群到发出验证提示的耗时"""
+        joined_at = time.monotonic()
+        results = await asyncio.gather(
+            *(self._process_joined_user(event, platform, gid, uid, joined_at) for uid in uids),
+            return_exceptions=True,
+        )
+
+        latencies = []
+        for uid, result in zip(uids, results):
+            if isinstance(result, Exception):
+                logger.error(f"[Geetest Verify] 处理新成员 {uid} 失败: {result}")
+            elif result is not None:
+                latencies.append(result)
+
+        if not latencies:
+            return
+        latencies.sort()
+        stats = self._join_stats
+        stats["prompted"] += len(latencies)
+        stats["last_first_latency"] = latencies[0]
+        stats["last_nth_latency"] = latencies[-1]
+        stats["max_nth_latency"] = max(stats["max_nth_latency"], latencies[-1])
+        logger.info(f"[Geetest Verify] 群 {gid} 已向 {len(latencies)} 个新成员发出验证提示，第 1 个耗时 {latencies[0]:.2f} 秒，第 {len(latencies)} 个耗时 {latencies[-1]:.2f} 秒")
+
+    async def _process_joined_user(self, event: AstrMessageEvent, platform: str, gid: int, uid: str, joined_at: float):
+        """处理单个新成员，返回从入群到发出验证提示的秒数；跳过验证时返回 None"""
+        state_key = f"{gid}:{uid}"
 
-            cached = self.db.get_cached(state_key)
-            if cached and cached.get("status") == "bypassed":
-                logger.info(f"[Geetest Verify] 用户 {uid} 在群 {gid} 已标记为绕过验证，跳过验证流程")
-                continue
+        # 已验证/已绕过的状态不常驻内存，按主键查询（带 LRU）
+        cached = await self.db.get(state_key)
+        if cached and cached.get("status") == "bypassed":
+            logger.info(f"[Geetest Verify] 用户 {uid} 在群 {gid} 已标记为绕过验证，跳过验证流程")
+            return None
 
-            if cached and cached.get("status") == "verified":
-                logger.info(f"[Geetest Verify] 用户 {uid} 在群 {gid} 已验证过，跳过验证流程")
-                continue
+        if cached and cached.get("status") == "verified":
+            logger.info(f"[Geetest Verify] 用户 {uid} 在群 {gid} 已验证过，跳过验证流程")
+            return None
 
-            group_config = self._get_group_config(gid)
+        group_config = self._get_group_config(gid)
 
-            await asyncio.sleep(2)
+        await asyncio.sleep(2)
 
-            at_user = self._format_user_mention(event, uid)
-            skip_verify = False
+        at_user = self._format_user_mention(event, uid)
 
-            if platform == "aiocqhttp" and group_config["enable_level_verify"]:
+        if platform == "aiocqhttp" and group_config["enable_level_verify"]:
+            async with self._join_semaphore:
                 qq_level = await self._get_user_level(uid)
                 if qq_level == 0:
                     message = self.level_no_info_message.format(at_user=at_user)
@@ -208,28 +388,27 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
                     await self._send_group_message(event, gid, pass_msg)
                     await self.db.set(state_key, {
                         "status": "verified",
-                        "verify_time": asyncio.get_event_loop().time()
+                        "verify_time": time.time()
                     })
-                    skip_verify = True
+                    return None
                 else:
                     logger.info(f"[Geetest Verify] 用户 {uid} QQ等级为 {qq_level}，低于最低等级要求 {group_config['min_qq_level']}，将进入验证流程")
                     await self._send_group_message(event, gid, message)
 
-            if platform == "telegram":
-                logger.info(f"[Geetest Verify] 用户 {uid} 在 Telegram 群 {gid} 入群，直接进入验证流程")
-
-            if skip_verify:
-                continue
+        if platform == "telegram":
+            logger.info(f"[Geetest Verify] 用户 {uid} 在 Telegram 群 {gid} 入群，直接进入验证流程")
 
-            question, answer = self._generate_math_problem()
+        question, answer = self._generate_math_problem()
 
-            logger.info(f"[Geetest Verify] 用户 {uid} 在群 {gid} 入群，生成验证问题: {question} (答案: {answer})")
+        logger.info(f"[Geetest Verify] 用户 {uid} 在群 {gid} 入群，生成验证问题: {question} (答案: {answer})")
 
-            if group_config["verify_delay"] > 0:
-                logger.info(f"[Geetest Verify] 群 {gid} 新成员 {uid} 入群，将在 {group_config['verify_delay']} 秒后发送验证消息")
-                await asyncio.sleep(group_config['verify_delay'])
+        if group_config["verify_delay"] > 0:
+            logger.info(f"[Geetest Verify] 群 {gid} 新成员 {uid} 入群，将在 {group_config['verify_delay']} 秒后发送验证消息")
+            await asyncio.sleep(group_config['verify_delay'])
 
+        async with self._join_semaphore:
             await self._start_verification_process(event, uid, gid, question, answer, is_new_member=True, group_config=group_config)
+        return time.monotonic() - joined_at
 
     async def _process_verification_message(self, event: AstrMessageEvent):
         """处理群消息以进行验证"""
@@ -276,13 +455,9 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
 
         if not is_verification_answer:
             if group_config.get("recall_unverified_messages", False):
-                try:
-                    message_id = raw.get("message_id")
-                    if message_id:
-                        await event.bot.api.call_action("delete_msg", message_id=message_id)
-                        logger.info(f"已撤回未验证用户 {uid} 在群 {gid} 的消息")
-                except Exception as e:
-                    logger.warning(f"撤回消息失败: {e}")
+                message_id = self._get_raw_value(raw, "message_id")
+                if message_id:
+                    await self._outbox.enqueue(platform, gid, uid, "recall", {"message_id": message_id}, idem_suffix=str(message_id))
 
             if group_config.get("prompt_unverified_user", True):
                 try:
@@ -307,17 +482,13 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
                     logger.warning(f"[Geetest Verify] 发送错误提示失败: {e}")
 
                 if wrong_count >= group_config["max_wrong_answers"]:
-                    try:
-                        at_user = self._format_user_mention(event, uid)
-                        kick_msg = self.too_many_non_code_message.format(at_user=at_user, count=wrong_count)
-                        await self._send_group_message(event, gid, kick_msg)
-                        await asyncio.sleep(2)
-                        await self._kick_member(event, gid, uid)
-                        logger.info(f"[Geetest Verify] 用户 {uid} 因连续发送非验证码消息 {wrong_count} 次，已被踢出群 {gid}")
-                        await self.db.delete(state_key)
-                        self._tasks.pop(state_key, None)
-                    except Exception as e:
-                        logger.error(f"[Geetest Verify] 踢出用户 {uid} 失败: {e}")
+                    at_user = self._format_user_mention(event, uid)
+                    kick_msg = self.too_many_non_code_message.format(at_user=at_user, count=wrong_count)
+                    self._scheduler.cancel(state_key)
+                    await self._post_platform_message(platform, gid, kick_msg)
+                    await self._outbox.enqueue(platform, gid, uid, "kick", delay=2)
+                    logger.info(f"[Geetest Verify] 用户 {uid} 因连续发送非验证码消息 {wrong_count} 次，将被踢出群 {gid}")
+                    await self.db.delete(state_key)
 
             return
 
@@ -336,14 +507,11 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
 
             if is_valid:
                 logger.info(f"[Geetest Verify] 用户 {uid} 在群 {gid} 验证成功")
-                task = self._tasks.get(state_key)
-                if task and not task.done():
-                    task.cancel()
+                self._scheduler.cancel(state_key)
                 await self.db.set(state_key, {
                     "status": "verified",
-                    "verify_time": asyncio.get_event_loop().time()
+                    "verify_time": time.time()
                 })
-                self._tasks.pop(state_key, None)
 
                 at_user = self._format_user_mention(event, uid)
                 welcome_msg = self.welcome_message.format(at_user=at_user)
@@ -361,22 +529,16 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
                 if wrong_count >= max_wrong_answers:
                     logger.info(f"[Geetest Verify] 用户 {uid} 回答错误次数达到 {wrong_count} 次，将踢出")
 
-                    task = self._tasks.get(state_key)
-                    if task and not task.done():
-                        task.cancel()
+                    self._scheduler.cancel(state_key)
 
                     at_user = self._format_user_mention(event, uid)
                     kick_msg = self.too_many_wrong_message.format(at_user=at_user, count=wrong_count)
-                    await self._send_group_message(event, gid, kick_msg)
-
-                    await asyncio.sleep(2)
-                    await self._kick_member(event, gid, uid)
+                    await self._post_platform_message(platform, gid, kick_msg)
 
                     final_msg = self.too_many_wrong_kick_message.format(at_user=at_user)
-                    await self._send_group_message(event, gid, final_msg)
+                    await self._outbox.enqueue(platform, gid, uid, "kick", {"notice": final_msg}, delay=2)
 
                     await self.db.delete(state_key)
-                    self._tasks.pop(state_key, None)
 
                     event.stop_event()
                     return
@@ -396,14 +558,11 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
 
             if user_answer == correct_answer:
                 logger.info(f"[Geetest Verify] 用户 {uid} 在群 {gid} 验证成功")
-                task = self._tasks.get(state_key)
-                if task and not task.done():
-                    task.cancel()
+                self._scheduler.cancel(state_key)
                 await self.db.set(state_key, {
                     "status": "verified",
-                    "verify_time": asyncio.get_event_loop().time()
+                    "verify_time": time.time()
                 })
-                self._tasks.pop(state_key, None)
 
                 at_user = self._format_user_mention(event, uid)
                 welcome_msg = self.welcome_message.format(at_user=at_user)
@@ -421,22 +580,16 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
                 if wrong_count >= max_wrong_answers:
                     logger.info(f"[Geetest Verify] 用户 {uid} 回答错误次数达到 {wrong_count} 次，将踢出")
 
-                    task = self._tasks.get(state_key)
-                    if task and not task.done():
-                        task.cancel()
+                    self._scheduler.cancel(state_key)
 
                     at_user = self._format_user_mention(event, uid)
                     kick_msg = self.too_many_wrong_message.format(at_user=at_user, count=wrong_count)
-                    await self._send_group_message(event, gid, kick_msg)
-
-                    await asyncio.sleep(2)
-                    await self._kick_member(event, gid, uid)
+                    await self._post_platform_message(platform, gid, kick_msg)
 
                     final_msg = self.too_many_wrong_kick_message.format(at_user=at_user)
-                    await self._send_group_message(event, gid, final_msg)
+                    await self._outbox.enqueue(platform, gid, uid, "kick", {"notice": final_msg}, delay=2)
 
                     await self.db.delete(state_key)
-                    self._tasks.pop(state_key, None)
 
                     event.stop_event()
                     return
@@ -464,15 +617,13 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
 
         state_key = f"{gid}:{uid}"
 
-        if not self.db.contains(state_key):
+        # 已验证的记录不在内存中，需要查询数据库确认是否存在
+        if await self.db.get(state_key) is None:
             return
 
-        task = self._tasks.get(state_key)
-        if task and not task.done():
-            task.cancel()
+        self._scheduler.cancel(state_key)
 
         await self.db.delete(state_key)
-        self._tasks.pop(state_key, None)
 
         logger.info(f"[Geetest Verify] 用户 {uid} 已离开群 {gid}，清除验证状态")
 
@@ -528,32 +679,9 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
                     elif entity_type == "mention":
                         mention_text = text[self._get_raw_value(entity, "offset"):self._get_raw_value(entity, "offset") + self._get_raw_value(entity, "length")]
                         logger.info(f"[Geetest Verify] 找到 mention: {mention_text}")
-                        try:
-                            username = mention_text.lstrip('@')
-                            platform_client = self.context.get_platform("telegram").get_client()
-                            if hasattr(platform_client, "call_action"):
-                                logger.info(f"[Geetest Verify] 尝试获取用户 {username} 的信息")
-
-                                try:
-                                    chat_info = await platform_client.call_action("getChat", chat_id=f"@{username}")
-                                    if chat_info:
-                                        target_uid = str(chat_info.get("id"))
-                                        logger.info(f"[Geetest Verify] 通过 getChat 获取到用户 ID: {target_uid}")
-                                except Exception as e1:
-                                    logger.debug(f"[Geetest Verify] getChat 方法失败: {e1}")
-
-                                try:
-                                    peer_info = await platform_client.call_action("resolvePeer", username=username)
-                                    if peer_info:
-                                        peer_id = peer_info.get("peer", {}).get("user_id")
-                                        if peer_id:
-                                            target_uid = str(peer_id)
-                                            logger.info(f"[Geetest Verify] 通过 resolvePeer 获取到用户 ID: {target_uid}")
-                                except Exception as e2:
-                                    logger.debug(f"[Geetest Verify] resolvePeer 方法失败: {e2}")
-
-                        except Exception as e:
-                            logger.warning(f"[Geetest Verify] 从 Telegram API 获取用户信息失败: {e}")
+                        target_uid = self._usernames.lookup(mention_text)
+                        if target_uid:
+                            logger.info(f"[Geetest Verify] 从用户名索引获取到用户 ID: {target_uid}")
                         break
 
                 if not target_uid:
@@ -563,7 +691,11 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
                     if username_match:
                         username = username_match.group(1)
                         logger.info(f"[Geetest Verify] 从 message_str 中提取到 username: {username}")
-                        logger.warning("[Geetest Verify] Telegram Bot API 不支持通过 username 直接获取 user_id，请使用回复功能")
+                        target_uid = self._usernames.lookup(username)
+                        if target_uid:
+                            logger.info(f"[Geetest Verify] 从用户名索引获取到用户 ID: {target_uid}")
+                        else:
+                            logger.warning(f"[Geetest Verify] 用户名索引中没有 {username}，请使用回复功能")
         else:
             message = self._get_raw_value(raw, "message") or []
             for seg in message:
@@ -583,9 +715,7 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
 
         target_state_key = f"{gid}:{target_uid}"
 
-        old_task = self._tasks.get(target_state_key)
-        if old_task and not old_task.done():
-            old_task.cancel()
+        self._scheduler.cancel(target_state_key)
 
         question, answer = self._generate_math_problem()
 
@@ -640,17 +770,9 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
                         break
                     elif entity_type == "mention":
                         mention_text = text[self._get_raw_value(entity, "offset"):self._get_raw_value(entity, "offset") + self._get_raw_value(entity, "length")]
-                        try:
-                            username = mention_text.lstrip('@')
-                            platform_client = self.context.get_platform("telegram").get_client()
-                            if hasattr(platform_client, "call_action"):
-                                chat_member = await platform_client.call_action("getChatMember", chat_id=gid, username=username)
-                                if chat_member:
-                                    user_info = chat_member.get("user", {})
-                                    target_uid = str(user_info.get("id"))
-                                    logger.info(f"[Geetest Verify] 从 Telegram API 获取到目标用户: {target_uid}")
-                        except Exception as e:
-                            logger.warning(f"[Geetest Verify] 从 Telegram API 获取用户信息失败: {e}")
+                        target_uid = self._usernames.lookup(mention_text)
+                        if target_uid:
+                            logger.info(f"[Geetest Verify] 从用户名索引获取到目标用户: {target_uid}")
                         break
 
                 if not target_uid:
@@ -660,16 +782,9 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
                     if username_match:
                         username = username_match.group(1)
                         logger.info(f"[Geetest Verify] 从 message_str 中提取到 username: {username}")
-                        try:
-                            platform_client = self.context.get_platform("telegram").get_client()
-                            if hasattr(platform_client, "call_action"):
-                                chat_member = await platform_client.call_action("getChatMember", chat_id=gid, username=username)
-                                if chat_member:
-                                    user_info = chat_member.get("user", {})
-                                    target_uid = str(user_info.get("id"))
-                                    logger.info(f"[Geetest Verify] 从 Telegram API 获取到目标用户: {target_uid}")
-                        except Exception as e:
-                            logger.warning(f"[Geetest Verify] 从 Telegram API 获取用户信息失败: {e}")
+                        target_uid = self._usernames.lookup(username)
+                        if target_uid:
+                            logger.info(f"[Geetest Verify] 从用户名索引获取到目标用户: {target_uid}")
         else:
             message = self._get_raw_value(raw, "message") or []
             for seg in message:
@@ -687,14 +802,11 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
 
         target_state_key = f"{gid}:{target_uid}"
 
-        old_task = self._tasks.get(target_state_key)
-        if old_task and not old_task.done():
-            old_task.cancel()
+        self._scheduler.cancel(target_state_key)
 
         await self.db.set(target_state_key, {
             "status": "bypassed"
         })
-        self._tasks.pop(target_state_key, None)
 
         logger.info(f"[Geetest Verify] 用户 {target_uid} 已标记为绕过验证")
 
@@ -756,13 +868,56 @@ class GroupGeetestVerifyPlugin(ConfigMixin, PlatformMixin, VerifyMixin, Star):
             await self._send_group_message(event, gid, "本群暂未开启验证")
             return
 
-        self._update_group_config(gid, enabled=False)
+        # 关闭验证后不再踢出正在验证中的成员：由配置同步取消本群的待验证状态，这里等待其结果
+        propagation = self._update_group_config(gid, enabled=False)
+        cancelled = (await propagation).get(gid, 0) if propagation else 0
 
-        await self._send_group_message(event, gid, "已关闭本群验证")
+        if cancelled:
+            await self._send_group_message(event, gid, f"已关闭本群验证，并取消了 {cancelled} 名成员的待验证状态")
+        else:
+            await self._send_group_message(event, gid, "已关闭本群验证")
         logger.info(f"[Geetest Verify] 群 {gid} 已关闭验证")
 
         event.stop_event()
 
+    @filter.command("取消全部验证")
+    async def cancel_all_pending_command(self, event: AstrMessageEvent):
+        """取消本群所有待验证成员的验证，不再踢出"""
+        await self._run_group_pending_command(event, "cancel", "已取消本群 {count} 名成员的验证")
+
+    @filter.command("通过全部验证")
+    async def approve_all_pending_command(self, event: AstrMessageEvent):
+        """让本群所有待验证成员直接通过验证"""
+        await self._run_group_pending_command(event, "approve", "已让本群 {count} 名待验证成员通过验证")
+
+    @filter.command("重发全部验证")
+    async def reissue_all_pending_command(self, event: AstrMessageEvent):
+        """为本群所有待验证成员重新出题并重新计时"""
+        await self._run_group_pending_command(event, "reissue", "已为本群 {count} 名待验证成员重新发送验证")
+
+    async def _run_group_pending_command(self, event: AstrMessageEvent, action: str, done_message: str):
+        platform = self._get_platform(event)
+        raw = event.message_obj.raw_message
+        uid = str(event.get_sender_id())
+
+        gid = self._get_group_id(platform, raw)
+        if gid is None:
+            logger.warning("[Geetest Verify] 无法获取群组 ID，跳过批量验证命令")
+            return
+
+        if not await self._check_permission(event):
+            at_user = self._format_user_mention(event, uid)
+            await self._send_group_message(event, gid, f"{at_user} 只有群主、管理员或 Bot 管理员才能使用此指令")
+            return
+
+        count = await self._bulk_group_pending(gid, action)
+        if count:
+            await self._send_group_message(event, gid, done_message.format(count=count))
+        else:
+            await self._send_group_message(event, gid, "本群当前没有待验证的成员")
+
+        event.stop_event()
+
     @filter.command("设置验证超时时间")
     async def set_timeout_command(self, event: AstrMessageEvent):
         """设置验证超时时间"""
@@ -996,7 +1151,7 @@ Telegram 平台不支持等级验证，所有新成员均需完成验证"""
 最低QQ等级：{group_config['min_qq_level']} 级
 入群验证延时：{group_config['verify_delay']} 秒
 
-配置来源：{'群级别配置' if any(str(cfg.get('group_id')) == str(gid) for cfg in self.group_configs) else '全局默认配置'}"""
+配置来源：{'群级别配置' if self._has_group_config(gid) else '全局默认配置'}"""
 
         await self._send_group_message(event, gid, config_info)
         logger.info(f"[Geetest Verify] 群 {gid} 查看验证配置")
@@ -1,27 +1,99 @@
 from __future__ import annotations
 
 import copy
+import hashlib
 import json
-from collections.abc import Callable
+import time
+from bisect import bisect_right
+from collections.abc import Callable, Mapping
 from pathlib import Path
 from typing import Any
 
 from astrbot.api import AstrBotConfig, logger
 
+from .core.persistence import DebouncedWriter
 from .group_info_cache import GroupInfoCache
 
 DEFAULT_GROUP_ID = "__default__"
 _INTERNAL_STATE_FILE = "_internal_state.json"
+# 群列表分页的默认与最大每页条数
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# 单次批量操作 / 导入的最大条数
+MAX_BATCH_OPERATIONS = 20000
+
+
+class RevisionConflictError(Exception):
+    """按字段修改群配置时，提交的 revision 与当前配置不一致"""
+
+    def __init__(self, group_id: str, revision: str):
+        super().__init__(f"Group config {group_id} has been modified elsewhere (revision mismatch)")
+        self.group_id = group_id
+        self.revision = revision
+
+
+class _GroupIndex:
+    """按群号排序的索引，用于游标分页；游标为上一页最后一个群号"""
+
+    __slots__ = ("keys", "by_id", "source")
+
+    def __init__(self, by_id: Mapping[str, Any], source: Any = None):
+        self.by_id = by_id
+        self.keys = sorted(by_id)
+        self.source = source
+
+    def page(
+        self,
+        cursor: str | None,
+        limit: int,
+        match: Callable[[str], bool] | None = None,
+    ) -> tuple[list[str], str | None, int]:
+        """返回 (本页群号, 下一页游标, 符合条件的总数)"""
+        start = bisect_right(self.keys, cursor) if cursor else 0
+        if match is None:
+            page = self.keys[start:start + limit]
+            total = len(self.keys)
+            more = start + limit < total
+        else:
+            page: list[str] = []
+            total = 0
+            more = False
+            for pos, gid in enumerate(self.keys):
+                if not match(gid):
+                    continue
+                total += 1
+                if pos < start:
+                    continue
+                if len(page) < limit:
+                    page.append(gid)
+                else:
+                    more = True
+        return page, (page[-1] if more and page else None), total
 
 
 class PageService:
-    def __init__(self, config: AstrBotConfig, plugin_dir: Path, group_cache: GroupInfoCache, on_config_saved: Callable[[], None] | None = None):
+    def __init__(
+        self,
+        config: AstrBotConfig,
+        plugin_dir: Path,
+        group_cache: GroupInfoCache,
+        on_config_saved: Callable[[], None] | None = None,
+        persistence: DebouncedWriter | None = None,
+        on_group_patched: Callable[[str, list[str]], None] | None = None,
+    ):
         self.config = config
         self.plugin_dir = plugin_dir
         self.group_cache = group_cache
         self._on_config_saved = on_config_saved
+        self._on_group_patched = on_group_patched
+        self._persistence = persistence or DebouncedWriter()
         self.schema = self._load_schema()
         self._internal_cache: dict[str, Any] | None = None
+        self._config_index: _GroupIndex | None = None
+        self._available_index: _GroupIndex | None = None
+        # 配置版本号，每次保存递增，用于生成 ETag；启动时间作为前缀，重启后旧 ETag 全部失效
+        self.revision = 0
+        self._etag_seed = f"{int(time.time()):x}"
 
     def _load_schema(self) -> dict[str, Any]:
         schema_path = self.plugin_dir / "_conf_schema.json"
@@ -57,8 +129,8 @@ class PageService:
         return self._internal_cache
 
     def _save_internal(self) -> None:
-        path = self._get_internal_path()
-        path.write_text(json.dumps(self._internal_cache or {}, ensure_ascii=False, indent=2), encoding="utf-8")
+        # 到期时再取最新的内部状态序列化，合并窗口内的多次修改只写一次
+        self._persistence.save_json(self._get_internal_path(), lambda: self._internal_cache or {})
 
     def _get_internal(self, key: str, default: Any = None) -> Any:
         return self._load_internal().get(key, default)
@@ -67,6 +139,18 @@ class PageService:
         self._load_internal()
         self._internal_cache[key] = value
         self._save_internal()
+        self.bump_revision()
+
+    # ── revision / etag ──
+
+    def bump_revision(self) -> None:
+        """配置发生变化（页面保存或管理命令）时调用，使已下发的 ETag 失效"""
+        self.revision += 1
+
+    async def get_etag(self) -> str:
+        """页面数据的 ETag：配置版本号 + 群信息快照的刷新时间"""
+        snapshot = await self.group_cache.get_snapshot()
+        return f'W/"{self._etag_seed}-{self.revision}-{snapshot.refreshed_at:.0f}"'
 
     @property
     def default_schema(self) -> dict[str, Any]:
@@ -88,35 +172,101 @@ class PageService:
     # ── bootstrap ──
 
     async def get_bootstrap(self) -> dict[str, Any]:
-        groups = [self._build_default_entry()]
-        live_groups = await self.group_cache.list_groups()
+        """页面初始数据，群配置只包含第一页，其余通过 list_group_configs 分页获取；schema 单独获取"""
+        first_page = await self.list_group_configs()
+        return {
+            "groups": [self._build_default_entry(), *first_page["items"]],
+            "next_cursor": first_page["next_cursor"],
+            "total": first_page["total"],
+            "global_config": self._get_global_config(),
+        }
 
-        for cfg in self._get_group_configs():
-            group_id = cfg.get("group_id", "")
-            live_info = self._find_live_group(live_groups, group_id)
-            groups.append(self._build_group_entry(cfg, live_info))
+    # ── paged listing ──
 
+    async def list_group_configs(
+        self,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        query: str = "",
+        enabled: bool | None = None,
+    ) -> dict[str, Any]:
+        """按群号顺序分页返回已配置的群，可按群号/群名前缀和启用状态筛选"""
+        index = self._get_config_index()
+        live_groups = (await self.group_cache.get_snapshot()).by_id
+        match = self._build_matcher(query, live_groups)
+        if enabled is not None:
+            by_id = index.by_id
+            name_match = match
+            match = lambda gid: bool(by_id[gid].get("enabled", False)) == enabled and (  # noqa: E731
+                name_match is None or name_match(gid)
+            )
+
+        page, next_cursor, total = index.page(cursor, self._clamp_limit(limit), match)
         return {
-            "schema": {
-                "global": self.global_schema,
-                "default": self.default_schema,
-            },
-            "groups": groups,
-            "global_config": self._get_global_config(),
+            "items": [self._build_group_entry(index.by_id[gid], live_groups.get(gid)) for gid in page],
+            "next_cursor": next_cursor,
+            "total": total,
         }
 
-    # ── available groups ──
+    async def get_available_groups(
+        self,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        query: str = "",
+    ) -> dict[str, Any]:
+        """按群号顺序分页返回尚未配置的群，可按群号/群名前缀筛选"""
+        snapshot = await self.group_cache.get_snapshot()
+        index = self._available_index
+        if index is None or index.source is not snapshot:
+            index = self._available_index = _GroupIndex(snapshot.by_id, snapshot)
+
+        configured = self._get_config_index().by_id
+        name_match = self._build_matcher(query, snapshot.by_id)
+        match = lambda gid: gid not in configured and (name_match is None or name_match(gid))  # noqa: E731
 
-    async def get_available_groups(self) -> list[dict[str, Any]]:
-        """返回尚未配置的群列表"""
-        live_groups = await self.group_cache.list_groups()
-        existing_ids = {str(cfg.get("group_id", "")) for cfg in self._get_group_configs()}
-        available = []
-        for g in live_groups:
-            gid = str(g.get("group_id", ""))
-            if gid and gid not in existing_ids:
-                available.append(g)
-        return available
+        page, next_cursor, total = index.page(cursor, self._clamp_limit(limit), match)
+        return {
+            "items": [dict(index.by_id[gid]) for gid in page],
+            "next_cursor": next_cursor,
+            "total": total,
+        }
+
+    def _get_config_index(self) -> _GroupIndex:
+        """群号 -> 群配置的索引；配置列表被替换或增删时重建"""
+        group_configs = self.config.get("group_configs", [])
+        source = (id(group_configs), len(group_configs))
+        index = self._config_index
+        if index is None or index.source != source:
+            by_id = {}
+            for cfg in group_configs:
+                group_id = str(cfg.get("group_id", "")).strip()
+                if group_id:
+                    # 与 config.py 一致：同一群号以第一条配置为准
+                    by_id.setdefault(group_id, cfg)
+            index = self._config_index = _GroupIndex(by_id, source)
+        return index
+
+    @staticmethod
+    def _build_matcher(query: str, live_groups: Mapping[str, Mapping[str, Any]]) -> Callable[[str], bool] | None:
+        prefix = (query or "").strip().casefold()
+        if not prefix:
+            return None
+
+        def match(gid: str) -> bool:
+            if gid.startswith(prefix):
+                return True
+            live = live_groups.get(gid)
+            return live is not None and str(live.get("group_name", "")).casefold().startswith(prefix)
+
+        return match
+
+    @staticmethod
+    def _clamp_limit(limit: Any) -> int:
+        try:
+            value = int(limit)
+        except (TypeError, ValueError):
+            return DEFAULT_PAGE_SIZE
+        return max(1, min(value, MAX_PAGE_SIZE))
 
     # ── config read ──
 
@@ -155,12 +305,14 @@ class PageService:
                 logger.warning(f"Failed to notify config change: {exc}")
 
     def _save_config(self) -> None:
-        self.config.save_config()
+        self._persistence.save_config(self.config)
+        self.bump_revision()
         self._notify_config_changed()
 
     def _save_group_configs(self, group_configs: list[dict[str, Any]]) -> None:
         """保存群配置列表，写入 self.config['group_configs']（与 config.py 共享）"""
         self.config["group_configs"] = group_configs
+        self._config_index = None
         self._save_config()
 
     def _save_default_config(self, data: dict[str, Any]) -> dict[str, Any]:
@@ -191,10 +343,9 @@ class PageService:
         except Exception:
             pass
 
-        group_configs = self._get_group_configs()
-        for cfg in group_configs:
-            if str(cfg.get("group_id", "")) == str(group_id):
-                return self._build_group_detail(cfg, live_info)
+        cfg = self._get_config_index().by_id.get(str(group_id).strip())
+        if cfg is not None:
+            return self._build_group_detail(cfg, live_info)
 
         raise ValueError(f"Group config not found: {group_id}")
 
@@ -208,39 +359,162 @@ class PageService:
         return self._save_custom_group_config(group_id, data)
 
     def _save_custom_group_config(self, group_id: str, data: dict[str, Any]) -> dict[str, Any]:
-        group_configs = self._get_group_configs()
+        self.apply_group_batch([{"op": "upsert", "group_id": group_id, "config": data}])
+        return self._build_group_entry(self._get_config_index().by_id[str(group_id).strip()])
 
-        found = False
-        for cfg in group_configs:
-            if str(cfg.get("group_id", "")) == str(group_id):
-                template_key = cfg.get("__template_key", "default_config")
-                cfg.clear()
-                cfg.update(data)
-                cfg["group_id"] = group_id
-                cfg["__template_key"] = template_key
-                found = True
-                break
+    def delete_group_config(self, group_id: str) -> None:
+        self.apply_group_batch([{"op": "delete", "group_id": group_id}])
 
-        if not found:
-            data["group_id"] = group_id
-            data["__template_key"] = "default_config"
-            group_configs.append(data)
+    def patch_group_config(
+        self,
+        group_id: str,
+        changes: dict[str, Any] | None,
+        unset: list[str] | None = None,
+        revision: str | None = None,
+    ) -> dict[str, Any]:
+        """按字段修改单个群配置，只改动提交的键
+
+        revision 与当前配置不一致时抛出 RevisionConflictError；
+        只把实际变化的键通知插件更新编译后的配置，不重新加载全部配置。
+        """
+        changes = changes or {}
+        unset = unset or []
+        if not isinstance(changes, dict) or not isinstance(unset, list):
+            raise ValueError("set must be an object and unset must be a list")
+
+        normalized = str(group_id or "").strip()
+        cfg = self._get_config_index().by_id.get(normalized)
+        if cfg is None:
+            raise ValueError(f"Group config not found: {group_id}")
+        current = self._group_revision(cfg)
+        if revision and revision != current:
+            raise RevisionConflictError(normalized, current)
+
+        allowed = set(self.default_schema) - {"group_id"}
+        unknown = [key for key in (*changes, *unset) if key not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown config keys: {', '.join(map(str, unknown))}")
+
+        changed = {key: value for key, value in changes.items() if key not in cfg or cfg[key] != value}
+        removed = [key for key in unset if key in cfg and key not in changes]
+        if changed or removed:
+            # 直接修改共享的配置条目（与 config.py 中的原始配置是同一个字典）
+            cfg.update(changed)
+            for key in removed:
+                del cfg[key]
+            self._persistence.save_config(self.config)
+            self.bump_revision()
+            keys = [*changed, *removed]
+            if self._on_group_patched:
+                try:
+                    self._on_group_patched(normalized, keys)
+                except Exception as exc:
+                    logger.warning(f"Failed to apply group config patch: {exc}")
+            else:
+                self._notify_config_changed()
 
-        self._save_group_configs(group_configs)
+        return {
+            "group_id": normalized,
+            "revision": self._group_revision(cfg),
+            "changed": [*changed, *removed],
+        }
 
-        for cfg in group_configs:
-            if str(cfg.get("group_id", "")) == str(group_id):
-                return self._build_group_entry(cfg)
+    # ── batch / import / export ──
+
+    def apply_group_batch(self, operations: list[dict[str, Any]], replace_all: bool = False) -> dict[str, Any]:
+        """一次应用多个群配置的新增/更新（upsert）和删除（delete）
+
+        所有操作先校验，全部合法才会应用；整个批次只写入一次配置、通知插件重新加载一次。
+        replace_all 为 True 时先清空现有群配置（用于导入）。
+        """
+        parsed = self._parse_batch_operations(operations)
+
+        # 列表只做浅拷贝，被修改的条目整体替换为新字典，未修改的条目不复制
+        group_configs: list[dict[str, Any] | None] = [] if replace_all else list(self.config.get("group_configs", []))
+        positions: dict[str, list[int]] = {}
+        for pos, cfg in enumerate(group_configs):
+            positions.setdefault(str(cfg.get("group_id", "")).strip(), []).append(pos)
+
+        upserted = deleted = 0
+        for op, group_id, data in parsed:
+            existing = positions.get(group_id)
+            if op == "delete":
+                if existing:
+                    for pos in positions.pop(group_id):
+                        group_configs[pos] = None
+                    deleted += 1
+                continue
+            if existing:
+                pos = existing[0]
+                group_configs[pos] = self._build_config_record(group_id, data, group_configs[pos])
+            else:
+                positions[group_id] = [len(group_configs)]
+                group_configs.append(self._build_config_record(group_id, data, None))
+            upserted += 1
+
+        if upserted or deleted or replace_all:
+            self._save_group_configs([cfg for cfg in group_configs if cfg is not None])
+        return {
+            "upserted": upserted,
+            "deleted": deleted,
+            "total": len(self._get_config_index().by_id),
+        }
 
-        return self._build_group_entry({"group_id": group_id, **data})
+    def import_group_configs(self, records: list[dict[str, Any]], replace_all: bool = False) -> dict[str, Any]:
+        """导入群配置记录（每条为完整的群配置，含 group_id）"""
+        operations = [{"op": "upsert", "group_id": record.get("group_id"), "config": record} for record in records]
+        return self.apply_group_batch(operations, replace_all=replace_all)
 
-    def delete_group_config(self, group_id: str) -> None:
-        group_configs = self._get_group_configs()
-        group_configs = [c for c in group_configs if str(c.get("group_id", "")) != str(group_id)]
-        self._save_group_configs(group_configs)
+    def iter_group_config_lines(self):
+        """逐行生成 NDJSON 格式的群配置，用于导出；遍历的是调用时列表的浅拷贝"""
+        for cfg in list(self.config.get("group_configs", [])):
+            yield json.dumps(cfg, ensure_ascii=False) + "\n"
+
+    @staticmethod
+    def _parse_batch_operations(operations: Any) -> list[tuple[str, str, dict[str, Any] | None]]:
+        if not isinstance(operations, list):
+            raise ValueError("operations must be a list")
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            raise ValueError(f"Too many operations (max {MAX_BATCH_OPERATIONS})")
+
+        parsed = []
+        for index, item in enumerate(operations):
+            if not isinstance(item, dict):
+                raise ValueError(f"Operation #{index + 1} must be an object")
+            op = item.get("op", "upsert")
+            group_id = str(item.get("group_id") or "").strip()
+            if not group_id or group_id == DEFAULT_GROUP_ID:
+                raise ValueError(f"Operation #{index + 1} has an invalid group_id")
+            if op == "delete":
+                parsed.append((op, group_id, None))
+            elif op == "upsert":
+                data = item.get("config")
+                if not isinstance(data, dict):
+                    raise ValueError(f"Operation #{index + 1} must carry a config object")
+                parsed.append((op, group_id, data))
+            else:
+                raise ValueError(f"Operation #{index + 1} has an unknown op: {op}")
+        return parsed
+
+    @staticmethod
+    def _build_config_record(group_id: str, data: dict[str, Any], existing: dict[str, Any] | None) -> dict[str, Any]:
+        record = dict(data)
+        record["group_id"] = group_id
+        record["__template_key"] = (
+            (existing or {}).get("__template_key")
+            or data.get("__template_key")
+            or "default_config"
+        )
+        return record
 
     # ── entry builders (list) ──
 
+    @staticmethod
+    def _group_revision(cfg: Mapping[str, Any]) -> str:
+        """群配置内容的摘要，用于按字段修改时的并发检查"""
+        encoded = json.dumps(cfg, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha1(encoded).hexdigest()[:16]
+
     def _build_default_entry(self) -> dict[str, Any]:
         return {
             "group_id": DEFAULT_GROUP_ID,
@@ -253,7 +527,7 @@ class PageService:
     def _build_group_entry(
         self,
         cfg: dict[str, Any],
-        live_info: dict[str, Any] | None = None,
+        live_info: Mapping[str, Any] | None = None,
     ) -> dict[str, Any]:
         group_id = str(cfg.get("group_id", ""))
 
@@ -272,6 +546,7 @@ class PageService:
             "avatar": avatar,
             "member_count": member_count,
             "is_default_group": False,
+            "revision": self._group_revision(cfg),
             "config": copy.deepcopy(cfg),
         }
 
@@ -293,7 +568,7 @@ class PageService:
     def _build_group_detail(
         self,
         cfg: dict[str, Any],
-        live_info: dict[str, Any] | None = None,
+        live_info: Mapping[str, Any] | None = None,
     ) -> dict[str, Any]:
         group_id = str(cfg.get("group_id", ""))
 
@@ -316,16 +591,6 @@ class PageService:
                 "member_count": member_count,
             },
             "is_default_group": False,
+            "revision": self._group_revision(cfg),
             "config": copy.deepcopy(cfg),
         }
-
-    # ── helpers ──
-
-    @staticmethod
-    def _find_live_group(
-        live_groups: list[dict[str, Any]], group_id: str
-    ) -> dict[str, Any] | None:
-        for g in live_groups:
-            if str(g.get("group_id", "")) == str(group_id):
-                return g
-        return None
@@ -70,6 +70,37 @@ class PlatformMixin(GeetestAPIMixin):
             logger.warning("[Geetest Verify] 无法从 QQ 消息中获取群组 ID")
             return None
 
+    def _peek_message_group_id(self, platform: str, raw):
+        """快速取出普通群消息的群号，不写日志；入群/退群等事件或取不到时返回 None"""
+        get = self._get_raw_value
+        if platform == "aiocqhttp":
+            if get(raw, "post_type") != "message":
+                return None
+            return get(raw, "group_id")
+
+        if get(raw, "new_chat_member") or get(raw, "new_chat_members") or get(raw, "left_chat_member"):
+            return None
+        chat = get(raw, "chat")
+        if not chat:
+            chat = get(get(raw, "message"), "chat")
+        return get(chat, "id") if chat else None
+
+    def _observe_telegram_users(self, raw):
+        """从 Telegram 事件中顺带记录用户名与用户 ID 的对应关系（发送者、新成员、被回复者）"""
+        get = self._get_raw_value
+        index = self._usernames
+        message = get(raw, "message") or raw
+        for user in (
+            get(raw, "from"),
+            get(message, "from") if message is not raw else None,
+            get(get(message, "reply_to_message"), "from"),
+            get(get(raw, "new_chat_member"), "user"),
+        ):
+            if user:
+                index.observe(get(user, "username"), get(user, "id"))
+        for user in get(message, "new_chat_members") or ():
+            index.observe(get(user, "username"), get(user, "id"))
+
     def _format_user_mention(self, event, uid: str) -> str:
         """根据平台格式化用户提及"""
         platform = self._get_platform(event)
@@ -89,26 +120,46 @@ class PlatformMixin(GeetestAPIMixin):
         else:
             return f"[CQ:at,qq={uid}]"
 
+    def _format_user_mention_by_id(self, platform: str, uid: str) -> str:
+        """在没有事件对象时（如定时任务中）根据平台格式化用户提及"""
+        if platform == "aiocqhttp":
+            return f"[CQ:at,qq={uid}]"
+        return f"[用户](tg://user?id={uid})"
+
+    def _get_platform_client(self, platform: str, gid: int = None):
+        """获取平台客户端；多个 QQ bot 时优先返回群所在 bot 的客户端"""
+        if gid is not None and platform == "aiocqhttp":
+            client = self._group_cache.get_client_for_group(gid)
+            if client is not None:
+                return client
+        return self.context.get_platform(platform).get_client()
+
     async def _send_group_message(self, event, gid: int, message: str):
         """根据平台发送群消息。如果 message 为空则不发送。"""
+        await self._send_platform_message(self._get_platform(event), gid, message)
+
+    async def _send_platform_message(self, platform: str, gid: int, message: str):
+        """按平台名称发送群消息，供没有事件对象的场景使用。如果 message 为空则不发送。
+
+        消息经过该群的出站队列限速发送，等待发送完成后返回。
+        """
         if not message:
             return
-        platform = self._get_platform(event)
-        try:
-            platform_client = self.context.get_platform(platform).get_client()
+        future = await self._outbound.send(platform, gid, message)
+        await future
 
-            if platform == "telegram":
-                if hasattr(platform_client, "call_action"):
-                    await platform_client.call_action("send_message", chat_id=gid, text=message, parse_mode="Markdown")
-                else:
-                    await platform_client.send_message(chat_id=gid, text=message, parse_mode="Markdown")
-            else:
-                if hasattr(platform_client, "api"):
-                    await platform_client.api.call_action("send_group_msg", group_id=gid, message=message)
-                elif hasattr(platform_client, "call_action"):
-                    await platform_client.call_action("send_group_msg", group_id=gid, message=message)
-        except Exception as e:
-            logger.error(f"[Geetest Verify] 发送消息失败: {e}")
+    async def _post_platform_message(self, platform: str, gid: int, message: str):
+        """将群消息放入出站队列后立即返回，不等待发送完成。如果 message 为空则不发送。"""
+        if not message:
+            return
+        await self._outbound.send(platform, gid, message)
+
+    async def _send_join_prompt(self, event, gid: int, message: str):
+        """发送入群验证提示，放入出站队列后立即返回
+
+        多人同时入群时，排队中的提示会由出站队列合并为一条消息发送。
+        """
+        await self._post_platform_message(self._get_platform(event), gid, message)
 
     def _resolve_image_path(self, image_path: str) -> str:
         """解析图片路径，支持 URL、绝对路径和相对路径"""
@@ -133,29 +184,46 @@ class PlatformMixin(GeetestAPIMixin):
         if not resolved_path:
             return await self._send_group_message(event, gid, text)
 
-        platform = self._get_platform(event)
-        try:
-            platform_client = self.context.get_platform(platform).get_client()
+        future = await self._outbound.send(self._get_platform(event), gid, text, image=resolved_path)
+        await future
 
-            if platform == "telegram":
-                if hasattr(platform_client, "call_action"):
-                    await platform_client.call_action("send_photo", chat_id=gid, photo=resolved_path, caption=text)
+    async def _deliver_group_message(self, platform: str, gid: int, text: str, image: str = None):
+        """出站队列的实际发送函数，失败时抛出异常由队列重试"""
+        platform_client = self._get_platform_client(platform, gid)
+
+        if image:
+            try:
+                if platform == "telegram":
+                    if hasattr(platform_client, "call_action"):
+                        await platform_client.call_action("send_photo", chat_id=gid, photo=image, caption=text)
+                    else:
+                        await platform_client.send_photo(chat_id=gid, photo=image, caption=text)
                 else:
-                    await platform_client.send_photo(chat_id=gid, photo=resolved_path, caption=text)
+                    message_with_image = f"{text}\n[CQ:image,file={image}]"
+                    if hasattr(platform_client, "api"):
+                        await platform_client.api.call_action("send_group_msg", group_id=gid, message=message_with_image)
+                    elif hasattr(platform_client, "call_action"):
+                        await platform_client.call_action("send_group_msg", group_id=gid, message=message_with_image)
+                return
+            except Exception as e:
+                logger.error(f"[Geetest Verify] 发送带图片消息失败: {e}")
+                if not text:
+                    raise
+
+        if platform == "telegram":
+            if hasattr(platform_client, "call_action"):
+                await platform_client.call_action("send_message", chat_id=gid, text=text, parse_mode="Markdown")
             else:
-                message_with_image = f"{text}\n[CQ:image,file={resolved_path}]"
-                if hasattr(platform_client, "api"):
-                    await platform_client.api.call_action("send_group_msg", group_id=gid, message=message_with_image)
-                elif hasattr(platform_client, "call_action"):
-                    await platform_client.call_action("send_group_msg", group_id=gid, message=message_with_image)
-        except Exception as e:
-            logger.error(f"[Geetest Verify] 发送带图片消息失败: {e}")
-            await self._send_group_message(event, gid, text)
-
-    async def _kick_member(self, event, gid: int, uid: str):
-        """根据平台踢出成员"""
-        platform = self._get_platform(event)
-        platform_client = self.context.get_platform(platform).get_client()
+                await platform_client.send_message(chat_id=gid, text=text, parse_mode="Markdown")
+        else:
+            if hasattr(platform_client, "api"):
+                await platform_client.api.call_action("send_group_msg", group_id=gid, message=text)
+            elif hasattr(platform_client, "call_action"):
+                await platform_client.call_action("send_group_msg", group_id=gid, message=text)
+
+    async def _kick_platform_member(self, platform: str, gid: int, uid: str):
+        """按平台名称踢出成员，供没有事件对象的场景使用"""
+        platform_client = self._get_platform_client(platform, gid)
 
         if platform == "telegram":
             if hasattr(platform_client, "call_action"):
@@ -168,6 +236,37 @@ class PlatformMixin(GeetestAPIMixin):
             elif hasattr(platform_client, "call_action"):
                 await platform_client.call_action("set_group_kick", group_id=gid, user_id=int(uid), reject_add_request=False)
 
+    async def _recall_platform_message(self, platform: str, gid: int, message_id):
+        """按平台名称撤回群消息"""
+        platform_client = self._get_platform_client(platform, gid)
+
+        if platform == "telegram":
+            if hasattr(platform_client, "call_action"):
+                await platform_client.call_action("deleteMessage", chat_id=gid, message_id=int(message_id))
+            else:
+                await platform_client.delete_message(chat_id=gid, message_id=int(message_id))
+        else:
+            if hasattr(platform_client, "api"):
+                await platform_client.api.call_action("delete_msg", message_id=message_id)
+            elif hasattr(platform_client, "call_action"):
+                await platform_client.call_action("delete_msg", message_id=message_id)
+
+    async def _execute_outbox_action(self, platform: str, gid: int, uid: str, action: str, payload: dict):
+        """动作发件箱的执行函数，失败时抛出异常由发件箱重试"""
+        if action == "kick":
+            await self._kick_platform_member(platform, gid, uid)
+            logger.info(f"[Geetest Verify] 已将用户 {uid} 踢出群 {gid}")
+            await self._post_platform_message(platform, gid, payload.get("notice"))
+        elif action == "recall":
+            await self._recall_platform_message(platform, gid, payload["message_id"])
+            logger.info(f"[Geetest Verify] 已撤回未验证用户 {uid} 在群 {gid} 的消息")
+        elif action == "notice":
+            future = await self._outbound.send(platform, gid, payload["message"])
+            if not await future:
+                raise RuntimeError("发送通知失败")
+        else:
+            logger.warning(f"[Geetest Verify] 未知的发件箱动作: {action}")
+
     async def _get_user_info(self, event, uid: str) -> dict:
         """根据平台获取用户信息"""
         platform = self._get_platform(event)
@@ -0,0 +1,123 @@
+"""群消息快速路径基准
+
+在不同的待验证用户规模下，测量 handle_event 处理“发送者无需验证”的普通群消息的平均耗时，
+覆盖 aiocqhttp 与 Telegram 两种消息格式。快速路径只做一次集合查询，耗时不应随待验证人数增长。
+
+插件对象只装配快速路径用到的属性（状态数据库、群信息缓存、用户名索引），不连接任何平台。
+需要在安装了 AstrBot 的环境中运行：
+
+    python scripts/bench_fast_path.py --pending 1000 10000 100000
+"""
+
+import argparse
+import asyncio
+import importlib
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+GROUPS = 500
+
+
+class FakeMessage:
+    __slots__ = ("raw_message",)
+
+    def __init__(self, raw_message):
+        self.raw_message = raw_message
+
+
+class FakeEvent:
+    """只实现 handle_event 快速路径用到的接口"""
+
+    message_str = ""
+
+    def __init__(self, platform: str, raw, sender_id: int, bot=None):
+        self._platform = platform
+        self._sender_id = sender_id
+        self.message_obj = FakeMessage(raw)
+        self.bot = bot
+
+    def get_platform_name(self) -> str:
+        return self._platform
+
+    def get_sender_id(self) -> int:
+        return self._sender_id
+
+
+def load_main_module(plugin_dir: Path):
+    sys.path.insert(0, str(plugin_dir.parent))
+    return importlib.import_module(f"{plugin_dir.name}.main")
+
+
+def build_events(count: int) -> dict:
+    """生成发送者均不在待验证名单中的普通群消息（用户 ID 与待验证用户不重叠）"""
+    bot = object()
+    events = {"aiocqhttp": [], "telegram": []}
+    for i in range(count):
+        gid, uid = 100000 + i % GROUPS, 90000000 + i
+        events["aiocqhttp"].append(FakeEvent("aiocqhttp", {
+            "post_type": "message", "message_type": "group", "group_id": gid, "user_id": uid,
+            "raw_message": "hello",
+        }, uid, bot))
+        events["telegram"].append(FakeEvent("telegram", {
+            "message": {
+                "message_id": i, "text": "hello",
+                "chat": {"id": -gid, "type": "supergroup"},
+                "from": {"id": uid, "username": f"user{uid}"},
+            },
+        }, uid))
+    return events
+
+
+async def run(main_module, tmp: Path, pending: int, events: dict, iterations: int):
+    plugin_cls = main_module.GroupGeetestVerifyPlugin
+    plugin = plugin_cls.__new__(plugin_cls)
+    plugin.db = main_module.VerifyStateDB(tmp / f"verify_states_{pending}.db")
+    plugin._group_cache = main_module.GroupInfoCache(None)
+    plugin._usernames = main_module.UsernameIndex(tmp / f"usernames_{pending}.db")
+    await plugin.db.init()
+
+    now = time.time()
+    await plugin.db.set_many({
+        f"{100000 + i % GROUPS}:{10000000 + i}": {
+            "status": "pending", "platform": "aiocqhttp", "verify_method": "geetest", "created_at": now,
+        }
+        for i in range(pending)
+    })
+
+    handle_event = plugin_cls.handle_event
+    for platform, platform_events in events.items():
+        # 确认测的是快速路径：都能直接取到群号
+        assert all(plugin._peek_message_group_id(platform, e.message_obj.raw_message) is not None for e in platform_events)
+        count = len(platform_events)
+        # 预热
+        for event in platform_events:
+            await handle_event(plugin, event)
+        start = time.perf_counter()
+        for i in range(iterations):
+            await handle_event(plugin, platform_events[i % count])
+        elapsed = time.perf_counter() - start
+        print(f"  {platform:9}: {iterations} events in {elapsed * 1000:7.1f} ms ({elapsed / iterations * 1e6:.2f} µs each)")
+    await plugin.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pending", type=int, nargs="+", default=[1000, 10000, 100000], help="待验证用户数")
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--senders", type=int, default=10000, help="轮流发送消息的不同用户数")
+    parser.add_argument("--plugin-dir", type=Path, default=PLUGIN_DIR, help="要测试的插件目录")
+    args = parser.parse_args()
+
+    main_module = load_main_module(args.plugin_dir.resolve())
+    events = build_events(args.senders)
+    with tempfile.TemporaryDirectory() as tmp:
+        for pending in args.pending:
+            print(f"{pending} pending users")
+            asyncio.run(run(main_module, Path(tmp), pending, events, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
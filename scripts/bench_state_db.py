@@ -0,0 +1,108 @@
+"""验证状态数据库的启动耗时与内存基准
+
+生成一个旧版 verify_states 表结构的数据库（默认 100 万行，1% 待验证），
+测量 VerifyStateDB.init 的耗时、tracemalloc 统计的常驻/峰值内存，以及按主键查询非待验证状态的平均耗时。
+
+需要在安装了 AstrBot 的环境中运行。用 --plugin-dir 指向其他版本的检出目录做对比，例如
+“只在内存中保留待验证状态”改动（6338510）前后：
+
+    git worktree add /tmp/geetest-before 6338510~1
+    git worktree add /tmp/geetest-after 6338510
+    python scripts/bench_state_db.py --plugin-dir /tmp/geetest-before
+    python scripts/bench_state_db.py --plugin-dir /tmp/geetest-after
+
+当前版本启动时会在后台把旧表迁移到新表，迁移期间的查询与迁移批次共用同一个连接；
+加 --after-migration 可在迁移完成后再测查询耗时。
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+
+
+def load_db_module(plugin_dir: Path):
+    sys.path.insert(0, str(plugin_dir.parent))
+    return importlib.import_module(f"{plugin_dir.name}.database.db")
+
+
+def build_legacy_db(path: Path, rows: int, pending_every: int, groups: int):
+    con = sqlite3.connect(path)
+    con.execute("""
+        CREATE TABLE verify_states (
+            state_key TEXT PRIMARY KEY, status TEXT NOT NULL, question TEXT, answer INTEGER,
+            wrong_count INTEGER DEFAULT 0, verify_method TEXT, max_wrong_answers INTEGER DEFAULT 5,
+            verify_time REAL, created_at REAL, platform TEXT, deadline REAL, timer_stage TEXT
+        )
+    """)
+    now = time.time()
+
+    def generate():
+        for i in range(rows):
+            if i % pending_every == 0:
+                status = "pending"
+            else:
+                status = "verified" if i % 3 else "bypassed"
+            yield (f"{100000 + i % groups}:{10000000 + i}", status, "1 + 2 = ?", 3, 0, "geetest", 5,
+                   now, now, "aiocqhttp", None, None)
+
+    con.executemany("INSERT INTO verify_states VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", generate())
+    con.commit()
+    con.close()
+
+
+async def run(db_module, path: Path, rows: int, groups: int, lookups: int, after_migration: bool):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    db = db_module.VerifyStateDB(path)
+    await db.init()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"init: {elapsed:.2f} s, resident {current / 2 ** 20:.1f} MiB, peak {peak / 2 ** 20:.1f} MiB")
+
+    migrate_task = getattr(db, "_migrate_task", None)
+    if after_migration and migrate_task is not None:
+        start = time.perf_counter()
+        await migrate_task
+        print(f"legacy migration: {time.perf_counter() - start:.2f} s after init")
+
+    # 查询非待验证状态（旧版本全部在内存中，新版本按主键查询数据库）
+    keys = [f"{100000 + i % groups}:{10000000 + i}" for i in range(1, rows, max(1, rows // lookups))][:lookups]
+    start = time.perf_counter()
+    for key in keys:
+        await db.get(key)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"lookups: {len(keys)} in {elapsed_ms:.1f} ms ({elapsed_ms / max(1, len(keys)):.3f} ms each)")
+    await db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--pending-every", type=int, default=100, help="每隔多少行一条待验证状态")
+    parser.add_argument("--groups", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--after-migration", action="store_true", help="等旧表迁移完成后再测查询耗时")
+    parser.add_argument("--plugin-dir", type=Path, default=PLUGIN_DIR, help="要测试的插件目录")
+    args = parser.parse_args()
+
+    db_module = load_db_module(args.plugin_dir.resolve())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "verify_states.db"
+        build_legacy_db(path, args.rows, args.pending_every, args.groups)
+        print(f"{args.rows} rows, 1/{args.pending_every} pending, plugin: {args.plugin_dir}")
+        asyncio.run(run(db_module, path, args.rows, args.groups, args.lookups, args.after_migration))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from collections.abc import Awaitable, Callable
 from pathlib import Path
 from typing import Any, cast
@@ -8,36 +10,84 @@ from astrbot.api import AstrBotConfig, logger
 from astrbot.api.star import Context
 
 try:
+    from quart import Response as QuartResponse
     from quart import jsonify as quart_jsonify
     from quart import request as quart_request_obj
 except ImportError:
+    QuartResponse = None
     quart_jsonify = None
     quart_request_obj = None
 
+from .core.persistence import DebouncedWriter
 from .group_info_cache import GroupInfoCache
-from .page_service import PageService
+from .page_service import DEFAULT_PAGE_SIZE, MAX_BATCH_OPERATIONS, MAX_PAGE_SIZE, PageService, RevisionConflictError
 
 PLUGIN_NAME = "astrbot_plugin_group_geetest_verify"
+# schema 运行期间不变，允许长时间缓存；配置数据每次都需向服务端验证 ETag
+SCHEMA_CACHE_CONTROL = "public, max-age=86400"
+DATA_CACHE_CONTROL = "private, no-cache"
+# NDJSON 导出时每次向客户端发送的行数
+EXPORT_CHUNK_LINES = 200
 
 
 class WebController:
-    def __init__(self, context: Context, config: AstrBotConfig, plugin_dir: Path, on_config_saved=None):
+    def __init__(
+        self,
+        context: Context,
+        config: AstrBotConfig,
+        plugin_dir: Path,
+        on_config_saved=None,
+        group_cache: GroupInfoCache | None = None,
+        persistence: DebouncedWriter | None = None,
+        on_group_patched=None,
+        on_pending_action: Callable[[int, str], Awaitable[int]] | None = None,
+        pending_lister: Callable[[int, int], dict[str, Any]] | None = None,
+    ):
         self.context = context
-        self.group_cache = GroupInfoCache(context)
-        self.service = PageService(config, plugin_dir, self.group_cache, on_config_saved=on_config_saved)
+        self._on_pending_action = on_pending_action
+        self._pending_lister = pending_lister
+        self.group_cache = group_cache or GroupInfoCache(context)
+        self.service = PageService(
+            config,
+            plugin_dir,
+            self.group_cache,
+            on_config_saved=on_config_saved,
+            persistence=persistence,
+            on_group_patched=on_group_patched,
+        )
+        # schema 预先序列化，按内容哈希生成 ETag
+        self._schema_body = json.dumps(
+            {"ok": True, "data": {"global": self.service.global_schema, "default": self.service.default_schema}},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        self._schema_etag = f'"{hashlib.sha256(self._schema_body).hexdigest()[:32]}"'
 
     def register_routes(self) -> None:
         routes = [
+            ("/settings/schema", self.page_schema, ["GET"], "Load config schema"),
             ("/settings/bootstrap", self.page_bootstrap, ["GET"], "Load page bootstrap data"),
-            ("/settings/available-groups", self.page_available_groups, ["GET"], "List groups without config"),
+            ("/settings/groups", self.page_list_groups, ["GET"], "List configured groups (paged)"),
+            ("/settings/available-groups", self.page_available_groups, ["GET"], "List groups without config (paged)"),
             ("/settings/group", self.page_get_group, ["GET"], "Get one group config"),
             ("/settings/group", self.page_save_group, ["POST"], "Save a group config"),
+            ("/settings/group/patch", self.page_patch_group, ["POST"], "Update individual fields of a group config"),
             (
                 "/settings/group/delete",
                 self.page_delete_group,
                 ["POST"],
                 "Delete a group config",
             ),
+            ("/settings/group/pending", self.page_list_pending, ["GET"], "List pending verifications of a group"),
+            (
+                "/settings/group/pending",
+                self.page_pending_action,
+                ["POST"],
+                "Cancel, approve or re-issue all pending verifications of a group",
+            ),
+            ("/settings/groups/batch", self.page_batch_groups, ["POST"], "Apply group config upserts/deletes in one pass"),
+            ("/settings/groups/export", self.page_export_groups, ["GET"], "Export group configs as NDJSON"),
+            ("/settings/groups/import", self.page_import_groups, ["POST"], "Import group configs from NDJSON"),
         ]
         for path, handler, methods, desc in routes:
             self.context.register_web_api(
@@ -49,7 +99,7 @@ class WebController:
 
     @staticmethod
     def _check_quart_available() -> None:
-        if quart_jsonify is None or quart_request_obj is None:
+        if quart_jsonify is None or quart_request_obj is None or QuartResponse is None:
             raise RuntimeError("Web framework is unavailable")
 
     @staticmethod
@@ -62,6 +112,35 @@ class WebController:
         WebController._check_quart_available()
         return cast(Any, quart_request_obj)
 
+    @staticmethod
+    def _etag_matches(header: str | None, etag: str) -> bool:
+        """If-None-Match 比较（弱比较，忽略 W/ 前缀）"""
+        if not header:
+            return False
+        target = etag.removeprefix("W/")
+        for candidate in header.split(","):
+            candidate = candidate.strip()
+            if candidate == "*" or candidate.removeprefix("W/") == target:
+                return True
+        return False
+
+    def _not_modified(self, etag: str, cache_control: str):
+        """If-None-Match 命中时返回 304 响应，否则返回 None"""
+        if not self._etag_matches(self._request().headers.get("If-None-Match"), etag):
+            return None
+        return cast(Any, QuartResponse)(b"", status=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+    async def _conditional_json(self, build: Callable[[], Awaitable[Any]]):
+        """按配置版本号做条件 GET：未变化时返回 304，不再读取和序列化配置"""
+        etag = await self.service.get_etag()
+        not_modified = self._not_modified(etag, DATA_CACHE_CONTROL)
+        if not_modified is not None:
+            return not_modified
+        response = self._jsonify({"ok": True, "data": await build()})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = DATA_CACHE_CONTROL
+        return response
+
     def _wrap_handler(
         self, handler: Callable[[], Awaitable]
     ) -> Callable[[], Awaitable]:
@@ -69,6 +148,8 @@ class WebController:
             self._check_quart_available()
             try:
                 return await handler()
+            except RevisionConflictError as exc:
+                return self._jsonify({"ok": False, "message": str(exc), "data": {"revision": exc.revision}}), 409
             except ValueError as exc:
                 return self._jsonify({"ok": False, "message": str(exc)}), 400
             except Exception as exc:
@@ -78,19 +159,53 @@ class WebController:
         wrapped.__name__ = handler.__name__
         return wrapped
 
+    async def page_schema(self):
+        not_modified = self._not_modified(self._schema_etag, SCHEMA_CACHE_CONTROL)
+        if not_modified is not None:
+            return not_modified
+        response = cast(Any, QuartResponse)(self._schema_body, mimetype="application/json")
+        response.headers["ETag"] = self._schema_etag
+        response.headers["Cache-Control"] = SCHEMA_CACHE_CONTROL
+        return response
+
     async def page_bootstrap(self):
-        data = await self.service.get_bootstrap()
-        return self._jsonify({"ok": True, "data": data})
+        return await self._conditional_json(self.service.get_bootstrap)
+
+    async def page_list_groups(self):
+        args = self._request().args
+        return await self._conditional_json(
+            lambda: self.service.list_group_configs(
+                cursor=args.get("cursor") or None,
+                limit=args.get("limit", DEFAULT_PAGE_SIZE),
+                query=args.get("q", ""),
+                enabled=self._parse_bool_arg(args.get("enabled")),
+            )
+        )
 
     async def page_available_groups(self):
-        data = await self.service.get_available_groups()
-        return self._jsonify({"ok": True, "data": data})
+        args = self._request().args
+        return await self._conditional_json(
+            lambda: self.service.get_available_groups(
+                cursor=args.get("cursor") or None,
+                limit=args.get("limit", DEFAULT_PAGE_SIZE),
+                query=args.get("q", ""),
+            )
+        )
+
+    @staticmethod
+    def _parse_bool_arg(value: str | None) -> bool | None:
+        if value is None or value == "":
+            return None
+        lowered = value.strip().lower()
+        if lowered in ("1", "true", "yes"):
+            return True
+        if lowered in ("0", "false", "no"):
+            return False
+        raise ValueError(f"Invalid boolean value: {value}")
 
     async def page_get_group(self):
-        request = self._request()
-        group_id = request.args.get("group_id", "")
-        data = await self.service.get_group_config(group_id)
-        return self._jsonify({"ok": True, "data": data})
+        group_id = self._request().args.get("group_id", "")
+        return await self._conditional_json(lambda: self.service.get_group_config(group_id))
 
     async def page_save_group(self):
         payload = await self._request().get_json(force=True, silent=True) or {}
@@ -102,6 +217,16 @@ class WebController:
             {"ok": True, "message": "Group config saved", "data": result}
         )
 
+    async def page_patch_group(self):
+        payload = await self._request().get_json(force=True, silent=True) or {}
+        result = self.service.patch_group_config(
+            payload.get("group_id"),
+            payload.get("set"),
+            payload.get("unset"),
+            payload.get("revision"),
+        )
+        return self._jsonify({"ok": True, "message": "Group config updated", "data": result})
+
     async def page_delete_group(self):
         payload = await self._request().get_json(force=True, silent=True) or {}
         group_id = payload.get("group_id")
@@ -109,3 +234,97 @@ class WebController:
         return self._jsonify(
             {"ok": True, "message": f"Group config for {group_id} deleted"}
         )
+
+    @staticmethod
+    def _parse_group_id(value: Any) -> int:
+        try:
+            return int(str(value).strip())
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid group_id: {value}") from None
+
+    async def page_list_pending(self):
+        if self._pending_lister is None:
+            raise RuntimeError("Pending verifications are unavailable")
+        args = self._request().args
+        group_id = self._parse_group_id(args.get("group_id"))
+        try:
+            limit = max(1, min(int(args.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        except (TypeError, ValueError):
+            limit = DEFAULT_PAGE_SIZE
+        # 待验证状态随时变化，不参与配置的 ETag 缓存
+        response = self._jsonify({"ok": True, "data": self._pending_lister(group_id, limit)})
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    async def page_pending_action(self):
+        if self._on_pending_action is None:
+            raise RuntimeError("Pending verifications are unavailable")
+        payload = await self._request().get_json(force=True, silent=True) or {}
+        group_id = self._parse_group_id(payload.get("group_id"))
+        action = str(payload.get("action") or "")
+        affected = await self._on_pending_action(group_id, action)
+        return self._jsonify(
+            {
+                "ok": True,
+                "message": f"{affected} pending verifications processed",
+                "data": {"group_id": group_id, "action": action, "affected": affected},
+            }
+        )
+
+    async def page_batch_groups(self):
+        payload = await self._request().get_json(force=True, silent=True) or {}
+        result = self.service.apply_group_batch(payload.get("operations"))
+        return self._jsonify({"ok": True, "message": "Group configs updated", "data": result})
+
+    async def page_export_groups(self):
+        lines = self.service.iter_group_config_lines()
+
+        async def generate():
+            chunk: list[str] = []
+            for line in lines:
+                chunk.append(line)
+                if len(chunk) >= EXPORT_CHUNK_LINES:
+                    yield "".join(chunk).encode("utf-8")
+                    chunk = []
+            if chunk:
+                yield "".join(chunk).encode("utf-8")
+
+        response = cast(Any, QuartResponse)(generate(), mimetype="application/x-ndjson")
+        response.headers["Content-Disposition"] = 'attachment; filename="geetest_group_configs.ndjson"'
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    async def page_import_groups(self):
+        """按行读取 NDJSON 请求体；全部解析成功后一次性应用，任一行出错则整体不生效"""
+        request = self._request()
+        replace_all = bool(self._parse_bool_arg(request.args.get("replace")))
+
+        records: list[dict[str, Any]] = []
+        buffer = b""
+        line_no = 0
+
+        def parse(raw: bytes) -> None:
+            nonlocal line_no
+            line_no += 1
+            raw = raw.strip()
+            if not raw:
+                return
+            try:
+                record = json.loads(raw)
+            except ValueError as exc:
+                raise ValueError(f"Line {line_no}: invalid JSON ({exc})") from exc
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {line_no}: expected a JSON object")
+            records.append(record)
+            if len(records) > MAX_BATCH_OPERATIONS:
+                raise ValueError(f"Too many records (max {MAX_BATCH_OPERATIONS})")
+
+        async for chunk in request.body:
+            buffer += chunk
+            *complete, buffer = buffer.split(b"\n")
+            for raw in complete:
+                parse(raw)
+        parse(buffer)
+
+        result = self.service.import_group_configs(records, replace_all=replace_all)
+        return self._jsonify({"ok": True, "message": f"Imported {len(records)} group configs", "data": result})